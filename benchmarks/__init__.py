@@ -0,0 +1,2 @@
+""" Benchmarks of the evaluation, parsing, loading and rendering hot
+paths. Run with ``python -m benchmarks.run``."""
@@ -0,0 +1,195 @@
+""" Benchmark cases.
+
+Each case is a setup function registered with :func:`case` and the
+grid of its parameters. The setup builds the fixtures and returns the
+function to time, or a (function, cleanup) pair.
+"""
+import os
+import tempfile
+import itertools
+from benchmarks import fixtures
+
+CASES = []
+
+
+def case(name, quick=None, **grid):
+    """ Register a setup function over the parameter grid. The quick
+    grid, when given, replaces some parameter lists in quick runs."""
+    def register(setup):
+        CASES.append({'name': name, 'setup': setup, 'grid': grid,
+                      'quick': quick or {}})
+        return setup
+    return register
+
+
+def expand(entry, quick=False):
+    """ Parameter sets of a registered case."""
+    grid = dict(entry['grid'])
+    if quick:
+        grid.update(entry['quick'])
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+@case('simulation.npv', pool_size=[1, 2, 4, 8], nb_controls=[64],
+      quick={'pool_size': [1, 2]})
+def simulation_npv(pool_size, nb_controls):
+    """ Fan-out overhead of Simulation.npv with a backend doing no
+    work. The workers are started before timing."""
+    from util.simulate import Simulation
+    config = fixtures.reservoir_config()
+    batch = fixtures.controls(nb_controls, config)
+    simulation = Simulation(config, backend=fixtures.NoopBackend(),
+                            use_cache=False, restart_dir=None,
+                            pool_size=pool_size)
+    simulation.npv(batch[:pool_size])
+    return (lambda: simulation.npv(batch)), simulation.close
+
+
+@case('optlog.read_log', nb_rows=[1000, 10000, 100000],
+      sidecar=[False, True], quick={'nb_rows': [1000, 10000]})
+def read_log(nb_rows, sidecar):
+    """ Parse an optimization log, from the text or from its binary
+    sidecar."""
+    from util.optlog import read_log as read
+    folder = tempfile.TemporaryDirectory()
+    path = os.path.join(folder.name, 'log.csv')
+    fixtures.optimization_log(nb_rows).to_csv(path, sep='\t', index=False)
+    read(path, cache=sidecar)
+    return (lambda: read(path, cache=sidecar)), folder.cleanup
+
+
+@case('plot_opt.groupby_level', nb_rows=[1000, 10000, 100000],
+      quick={'nb_rows': [1000, 10000]})
+def groupby_level(nb_rows):
+    """ First x_c of each level and the x_c of every row."""
+    from util.plot_opt import PlotOpt
+    plot = PlotOpt(fixtures.optimization_log(nb_rows), restore_npv=True)
+
+    def run():
+        plot.groupby_level()
+        plot.group_xcenter()
+    return run
+
+
+@case('models.comparison_frame', build=['concat', 'collection'],
+      nb_models=[4, 16], nb_steps=[7300], quick={'nb_models': [4]})
+def comparison_frame(build, nb_models, nb_steps):
+    """ Long-form frame of one column of several models, built with
+    pd.concat as the compare scripts did, or with ModelCollection."""
+    import pandas as pd
+    from util.models import ModelCollection
+    frames = fixtures.production_frames(nb_models, nb_steps)
+    if build == 'concat':
+        return lambda: pd.concat([frame.assign(Models=name)
+                                  for name, frame in frames.items()])
+
+    def run():
+        ModelCollection(frames).frame(('time', 'cum_op'))
+    return run
+
+
+@case('ensemble.update', nb_realizations=[1000], nb_steps=[730, 7300],
+      quick={'nb_steps': [730]})
+def ensemble_update(nb_realizations, nb_steps, chunk_size=256):
+    """ Streamed quantiles of an ensemble of production series."""
+    import numpy as np
+    from util.ensemble import EnsembleStats
+    series = np.cumsum(np.random.default_rng(0).lognormal(
+        size=(nb_realizations, nb_steps)), axis=1)
+
+    def run():
+        stats = EnsembleStats()
+        for start in range(0, nb_realizations, chunk_size):
+            stats.update(series[start:start + chunk_size])
+        stats.frame()
+    return run
+
+
+@case('plot.ensemble_method', method=['npv_boxplot', 'fan_chart'],
+      nb_models=[4, 8], nb_realizations=[1000], quick={'nb_models': [4]})
+def plot_ensemble_method(method, nb_models, nb_realizations, nb_steps=730):
+    """ Draw and save a PlotPymex figure of ensemble statistics: the
+    npv boxplot streamed from its .npy file, or the fan chart of
+    precomputed summaries."""
+    import numpy as np
+    from util.lazy import headless
+    headless()
+    from util.ensemble import EnsembleStats
+    from util.plot import PlotPymex
+    import matplotlib.pyplot as plt
+    folder = tempfile.TemporaryDirectory()
+    rng = np.random.default_rng(0)
+    npv_path = os.path.join(folder.name, 'npv.npy')
+    np.save(npv_path, -rng.normal(10., 2., (nb_realizations, nb_models)))
+    time = np.arange(1., nb_steps + 1.)
+    summaries = {f"M{model + 1}": EnsembleStats(index=time).update(
+        np.cumsum(rng.lognormal(size=(nb_realizations, nb_steps)), axis=1))
+        for model in range(nb_models)}
+    plot = PlotPymex(None, output=os.path.join(folder.name, 'fig.png'))
+
+    def run():
+        try:
+            if method == 'npv_boxplot':
+                plot.npv_boxplot(path=npv_path)
+            else:
+                plot.fan_chart(summaries, 'Cumulative Oil Production')
+        finally:
+            plt.close('all')
+    return run, folder.cleanup
+
+
+@case('plot.perm_2d', nb_rows=[60], nb_columns=[220])
+def plot_perm_2d(nb_rows, nb_columns):
+    """ Draw and save the permeability heatmap of an SPE10 sized
+    layer, read from the working folder as plot_perm_2d expects."""
+    import numpy as np
+    from util.lazy import headless
+    headless()
+    from util.plot import PlotPymex
+    import matplotlib.pyplot as plt
+    folder = tempfile.TemporaryDirectory()
+    np.save(os.path.join(folder.name, 'spe10_fperm.npy'),
+            np.random.default_rng(0).lognormal(size=(nb_rows, nb_columns)))
+    plot = PlotPymex(None, output=os.path.join(folder.name, 'fig.png'))
+
+    def run():
+        cwd = os.getcwd()
+        os.chdir(folder.name)
+        try:
+            plot.plot_perm_2d()
+        finally:
+            os.chdir(cwd)
+            plt.close('all')
+    return run, folder.cleanup
+
+
+PLOT_METHODS = ['plot_cum_oil_prod_zoom', 'plot_cum_oil_prod_zoom_spe',
+                'plot_oil_rate', 'plot_cum_gas_prod',
+                'plot_cum_gas_prod_zoom', 'plot_ave_pressure',
+                'plot_cum_wat_prod_zoom', 'cum_op_all_wells',
+                'oil_rate_all_wells']
+
+
+@case('plot.method', method=PLOT_METHODS, nb_models=[3, 7],
+      nb_steps=[730, 7300], quick={'nb_models': [3], 'nb_steps': [730]})
+def plot_method(method, nb_models, nb_steps):
+    """ Draw and save a PlotPymex figure."""
+    from util.lazy import headless
+    headless()
+    from util.models import ModelCollection
+    from util.plot import PlotPymex
+    import matplotlib.pyplot as plt
+    folder = tempfile.TemporaryDirectory()
+    models = ModelCollection(fixtures.production_frames(nb_models,
+                                                        nb_steps))
+    plot = PlotPymex(models, output=os.path.join(folder.name, 'fig.png'))
+
+    def run():
+        try:
+            getattr(plot, method)()
+        finally:
+            plt.close('all')
+    return run, folder.cleanup
+
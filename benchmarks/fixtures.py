@@ -0,0 +1,64 @@
+""" Synthetic fixtures of the benchmarks. """
+import numpy as np
+import pandas as pd
+from util.backend import Backend, SyntheticBackend, SyntheticModel
+
+
+class NoopBackend(Backend):
+
+    """ Backend returning at once, to time the evaluation overhead."""
+
+    def run(self, control, template, restore_file, res_param):
+        """ Return an empty model."""
+        return SyntheticModel(control, template, None, 0.)
+
+
+def reservoir_config(nb_prod=4, nb_inj=2, nb_cycles=3):
+    """ Reservoir parameters of the synthetic field."""
+    return {'template': ['synthetic.dat'], 'original': 'synthetic.dat',
+            'max_plat_prod': 1, 'max_plat_inj': 1,
+            'max_rate_prod': 1., 'max_rate_inj': 1.,
+            'nb_prod': nb_prod, 'nb_inj': nb_inj, 'nb_cycles': nb_cycles,
+            'run_folder': False}
+
+
+def controls(nb_controls, config, seed=0):
+    """ Random control vectors of the configuration."""
+    size = (config['nb_prod'] + config['nb_inj']) * config['nb_cycles']
+    return np.random.default_rng(seed).uniform(size=(nb_controls, size))
+
+
+def _vector_strings(vectors):
+    """ Vectors written as the optimizer writes them."""
+    return ['[' + ' '.join(f"{value:.8f}" for value in vector) + ']'
+            for vector in vectors]
+
+
+def optimization_log(nb_rows, nb_levels=3, nb_variables=18, seed=0):
+    """ Optimization log frame with the columns of the optimizer."""
+    rng = np.random.default_rng(seed)
+    levels = np.repeat(np.arange(nb_levels),
+                       np.diff(np.linspace(0, nb_rows, nb_levels + 1)
+                               .astype(int)))
+    # Trust region steps keep x_c until a step is accepted
+    accepted = rng.uniform(size=nb_rows) < 0.3
+    centers = rng.uniform(size=(nb_rows, nb_variables))
+    centers = centers[np.maximum.accumulate(
+        np.where(accepted, np.arange(nb_rows), 0))]
+    return pd.DataFrame({
+        'fob_c': -np.sort(rng.uniform(30., 50., nb_rows)),
+        'opt_level': levels,
+        'time-spend': np.cumsum(rng.uniform(1., 10., nb_rows)),
+        'nfev-hf': np.cumsum(rng.integers(0, 2, nb_rows)),
+        'x_c': _vector_strings(centers),
+        'x_s': _vector_strings(rng.uniform(size=(nb_rows, nb_variables)))})
+
+
+def production_frames(nb_models, nb_steps, nb_prod=4):
+    """ Production frames of several synthetic models, with daily
+    report steps."""
+    config = reservoir_config(nb_prod=nb_prod)
+    return {f"M{model}": SyntheticBackend(seed=model, days=nb_steps - 1,
+                                          report_step=1)
+            .run(None, 'synthetic.dat', False, config).prod
+            for model in range(nb_models)}
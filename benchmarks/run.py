@@ -0,0 +1,179 @@
+""" Run the benchmarks and compare them with a stored baseline.
+
+Run from the repository root::
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --output results.json --save-baseline
+    python -m benchmarks.run --filter plot --tolerance 0.25
+
+The results are written as json. Cases slower than the baseline by
+more than the tolerance are reported and make the run fail.
+
+Timings depend on the machine, so no baseline is shipped: create one
+on the machine the comparisons run on, before the change to measure,
+with ``--save-baseline``. It is written to benchmarks/baseline.json,
+or to the --baseline file.
+"""
+import os
+import sys
+import json
+import time
+import fnmatch
+import warnings
+import platform
+import argparse
+import statistics
+import importlib.metadata
+from benchmarks.cases import CASES, expand
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def case_id(name, params):
+    """ Identifier of a case and its parameters."""
+    return name + '[' + ','.join(f"{key}={value}"
+                                 for key, value in params.items()) + ']'
+
+
+def measure(run, repeat=5, budget=10.):
+    """ Time the function, once as a warm up and then repeat times,
+    stopping early when the budget in seconds is spent."""
+    run()
+    times = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - tic)
+        if time.perf_counter() - start > budget:
+            break
+    return {'min': min(times), 'median': statistics.median(times),
+            'mean': statistics.mean(times), 'repeat': len(times)}
+
+
+def run_cases(pattern='*', quick=False, repeat=5, budget=10.):
+    """ Run the matching cases.
+
+    Returns
+    -------
+    dict
+        Case identifier -> timings in seconds, or the error raised.
+
+    """
+    results = {}
+    for entry in CASES:
+        for params in expand(entry, quick):
+            name = case_id(entry['name'], params)
+            if not fnmatch.fnmatch(name, pattern) and \
+                    pattern not in name:
+                continue
+            cleanup = None
+            try:
+                setup = entry['setup'](**params)
+                run, cleanup = setup if isinstance(setup, tuple) \
+                    else (setup, None)
+                results[name] = measure(run, repeat, budget)
+            except Exception as exc:
+                results[name] = {'error': f"{type(exc).__name__}: {exc}"}
+            finally:
+                if cleanup is not None:
+                    cleanup()
+            print(format_result(name, results[name]), flush=True)
+    return results
+
+
+def environment():
+    """ Description of the machine and of the library versions."""
+    versions = {}
+    for package in ('numpy', 'pandas', 'matplotlib', 'seaborn'):
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return {'python': platform.python_version(),
+            'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), **versions}
+
+
+def format_result(name, result):
+    """ One line of the report."""
+    if 'error' in result:
+        return f"{name:<70} failed: {result['error']}"
+    return f"{name:<70} {1e3 * result['median']:10.2f} ms"
+
+
+def compare(results, baseline, tolerance=0.2):
+    """ Compare the medians with the baseline.
+
+    Returns
+    -------
+    lines: list
+        Report line of each case present in both.
+    regressions: list
+        Cases slower than the baseline by more than the tolerance.
+
+    """
+    lines = []
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None or 'error' in result or 'error' in reference:
+            continue
+        ratio = result['median'] / reference['median']
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            flag = '  faster'
+        lines.append(f"{name:<70} {ratio:6.2f}x{flag}")
+    return lines, regressions
+
+
+def main():
+    """ Command line entry."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='*',
+                        help='glob or substring of the cases to run')
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller parameter grids')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=10.,
+                        help='seconds of repeats of each case')
+    parser.add_argument('--output', default=None,
+                        help='json file of the results')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='json results to compare with')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    # Layout and font warnings of the figures would bury the report
+    warnings.simplefilter('ignore', UserWarning)
+    results = run_cases(args.filter, args.quick, args.repeat, args.budget)
+    document = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(document, file, indent=1, sort_keys=True)
+    regressions = []
+    if not os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nNo baseline at {args.baseline}: run with "
+              "--save-baseline to create it")
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        lines, regressions = compare(results, baseline, args.tolerance)
+        print(f"\nCompared with {args.baseline}:")
+        print('\n'.join(lines))
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(document, file, indent=1, sort_keys=True)
+    failed = [name for name, result in results.items()
+              if 'error' in result]
+    sys.exit(bool(regressions or failed))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,37 @@
 """ Compare results."""
-import pandas as pd
 from util.plot import PlotPymex
+from util.models import ModelCollection
+from util.dtypes import DtypePolicy
+from util.store import ResultsStore
 
 if __name__ == "__main__":
-    # Models
-    hfid = pd.read_pickle('./results/egg/layers/Egg_orig_wells.pkl')
-    uni1 = pd.read_pickle('./results/egg/ari/unif/Egg_ari_1_wells.pkl')
-    uni2 = pd.read_pickle('./results/egg/ari/unif/Egg_ari_2_wells.pkl')
-    uni3 = pd.read_pickle('./results/egg/ari/unif/Egg_ari_3_wells.pkl')
-    wav1 = pd.read_pickle('./results/egg/wav/unif/Egg_wav_1_wells.pkl')
-    wav2 = pd.read_pickle('./results/egg/wav/unif/Egg_wav_2_wells.pkl')
-    wav3 = pd.read_pickle('./results/egg/wav/unif/Egg_wav_3_wells.pkl')
-    concatenated = pd.concat([hfid.assign(Models='HF'),
-                              uni1.assign(Models='U1'),
-                              uni2.assign(Models='U2'),
-                              uni3.assign(Models='U3'),
-                              wav1.assign(Models='W1'),
-                              wav2.assign(Models='W2'),
-                              wav3.assign(Models='W3')])
+    # Models: only the plotted columns are loaded from the store
+    store = ResultsStore('./results/store')
+
+    def read(path, model):
+        """ Read the model results from the store."""
+        return store.from_pickle(path, 'egg', model,
+                                 columns=['time', 'cum_op'])
+
+    hfid = read('./results/egg/layers/Egg_orig_wells.pkl', 'HF')
+    uni1 = read('./results/egg/ari/unif/Egg_ari_1_wells.pkl', 'U1')
+    uni2 = read('./results/egg/ari/unif/Egg_ari_2_wells.pkl', 'U2')
+    uni3 = read('./results/egg/ari/unif/Egg_ari_3_wells.pkl', 'U3')
+    wav1 = read('./results/egg/wav/unif/Egg_wav_1_wells.pkl', 'W1')
+    wav2 = read('./results/egg/wav/unif/Egg_wav_2_wells.pkl', 'W2')
+    wav3 = read('./results/egg/wav/unif/Egg_wav_3_wells.pkl', 'W3')
+    models = ModelCollection({'HF': hfid,
+                              'U1': uni1,
+                              'U2': uni2,
+                              'U3': uni3,
+                              'W1': wav1,
+                              'W2': wav2,
+                              'W3': wav3},
+                             policy=DtypePolicy())
+    print(models.policy.report())
 
     # # Create a instance of PlotPymex class
-    plot = PlotPymex(concatenated)
+    plot = PlotPymex(models)
     breakpoint()
 
     # Plot cumulative oil production
@@ -1,26 +1,37 @@
 """ Compare results SPE."""
-import pandas as pd
 from util.plot import PlotPymex
+from util.models import ModelCollection
+from util.dtypes import DtypePolicy
+from util.store import ResultsStore
 
 if __name__ == "__main__":
-    # Models
-    hfid = pd.read_pickle('./results/spe10/old/mxspe010.pkl')
-    uni1 = pd.read_pickle('./results/spe10/old/mxspe010_ham_1.pkl')
-    uni2 = pd.read_pickle('./results/spe10/old/mxspe010_ham_2.pkl')
-    uni3 = pd.read_pickle('./results/spe10/old/mxspe010_ham_3.pkl')
-    wav1 = pd.read_pickle('./results/spe10/old/mxspe010_wav_1.pkl')
-    wav2 = pd.read_pickle('./results/spe10/old/mxspe010_wav_2.pkl')
-    wav3 = pd.read_pickle('./results/spe10/old/mxspe010_wav_3.pkl')
-    concatenated = pd.concat([hfid.assign(Models='HF'),
-                              uni1.assign(Models='U1'),
-                              uni2.assign(Models='U2'),
-                              uni3.assign(Models='U3'),
-                              wav1.assign(Models='W1'),
-                              wav2.assign(Models='W2'),
-                              wav3.assign(Models='W3')])
+    # Models: only the plotted columns are loaded from the store
+    store = ResultsStore('./results/store')
+
+    def read(path, model):
+        """ Read the model results from the store."""
+        return store.from_pickle(path, 'spe10', model,
+                                 columns=['time', 'cum_op'])
+
+    hfid = read('./results/spe10/old/mxspe010.pkl', 'HF')
+    uni1 = read('./results/spe10/old/mxspe010_ham_1.pkl', 'U1')
+    uni2 = read('./results/spe10/old/mxspe010_ham_2.pkl', 'U2')
+    uni3 = read('./results/spe10/old/mxspe010_ham_3.pkl', 'U3')
+    wav1 = read('./results/spe10/old/mxspe010_wav_1.pkl', 'W1')
+    wav2 = read('./results/spe10/old/mxspe010_wav_2.pkl', 'W2')
+    wav3 = read('./results/spe10/old/mxspe010_wav_3.pkl', 'W3')
+    models = ModelCollection({'HF': hfid,
+                              'U1': uni1,
+                              'U2': uni2,
+                              'U3': uni3,
+                              'W1': wav1,
+                              'W2': wav2,
+                              'W3': wav3},
+                             policy=DtypePolicy())
+    print(models.policy.report())
 
     # # Create a instance of PlotPymex class
-    plot = PlotPymex(concatenated)
+    plot = PlotPymex(models)
 
     # Plot cumulative oil production
     plot.npv_boxplot()
@@ -0,0 +1,30 @@
+""" Export the figures listed in a manifest.
+
+Run with::
+
+    python export_figures.py figures.yaml --pool-size 4
+
+Figures unchanged since the last export are kept; --force draws them
+all again.
+
+"""
+import sys
+import argparse
+from util.export import FigureBatch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('manifest', help='yaml manifest of the figures')
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('--store', default='./results/store',
+                        help='results store of the production frames')
+    parser.add_argument('--force', action='store_true',
+                        help='draw every figure again')
+    args = parser.parse_args()
+
+    batch = FigureBatch(args.manifest, args.pool_size, args.store,
+                        use_cache=not args.force)
+    timings = batch.run()
+    print(batch.report())
+    sys.exit(any(record['error'] for record in timings))
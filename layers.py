@@ -1,19 +1,30 @@
 """ Plot Layers comparation in Egg Model."""
-import pandas as pd
 from util.plot import PlotPymex
+from util.models import ModelCollection
+from util.dtypes import DtypePolicy
+from util.store import ResultsStore
 if __name__ == "__main__":
-    # Models
-    orig = pd.read_pickle('./results/egg/layers/orig.pkl')
-    lay_4 = pd.read_pickle('./results/egg/layers/4lay.pkl')
-    lay_3 = pd.read_pickle('./results/egg/layers/3lay.pkl')
-    lay_2 = pd.read_pickle('./results/egg/layers/2lay.pkl')
-    concatenated = pd.concat([orig.assign(Models='HF'),
-                              lay_4.assign(Models='4L'),
-                              lay_3.assign(Models='3L'),
-                              lay_2.assign(Models='2L')])
+    # Models: only the plotted columns are loaded from the store
+    store = ResultsStore('./results/store')
+
+    def read(path, model):
+        """ Read the model results from the store."""
+        return store.from_pickle(path, 'egg_layers', model,
+                                 columns=['time', 'cum_op'])
+
+    orig = read('./results/egg/layers/orig.pkl', 'HF')
+    lay_4 = read('./results/egg/layers/4lay.pkl', '4L')
+    lay_3 = read('./results/egg/layers/3lay.pkl', '3L')
+    lay_2 = read('./results/egg/layers/2lay.pkl', '2L')
+    models = ModelCollection({'HF': orig,
+                              '4L': lay_4,
+                              '3L': lay_3,
+                              '2L': lay_2},
+                             policy=DtypePolicy())
+    print(models.policy.report())
 
     # # Create a instance of PlotPymex class
-    plot = PlotPymex(concatenated)
+    plot = PlotPymex(models)
 
     # Plot cumulative oil production
     plot.plot_cum_oil_prod_zoom()
@@ -1,6 +1,7 @@
 """ Create plots for reservoir production."""
 import os
 from util.simulate import Simulation
+from util.store import ResultsStore
 
 if __name__ == "__main__":
     # Create simulation instance
@@ -23,3 +24,9 @@ if __name__ == "__main__":
     filename = filename + '.pkl'
     save_path = os.path.join(results.run_path, filename)
     results.prod.to_pickle(save_path)
+
+    # Columnar copy, readable by column and time window
+    model, _ = os.path.splitext(filename)
+    store = ResultsStore('./results/store')
+    store.write(results.prod, case=os.path.basename(results.run_path),
+                model=model)
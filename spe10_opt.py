@@ -1,15 +1,23 @@
-""" Plot optimization results from spe10."""
-import pandas as pd
+""" Plot optimization results from spe10.
+
+Run with --follow to watch the optimization log while it is written.
+"""
+import sys
 from util.plot_opt import PlotOpt
+from util.monitor import LiveMonitor
 
 if __name__ == "__main__":
     # Read csv
-    hf_df = pd.read_csv("./results/spe10/results_spe_ori.csv", sep='\t')
-    # hf_df = pd.read_csv("./results/egg/results_hf.csv", sep='\t')
-    # hf_df = pd.read_csv("./results/egg/results_orig_egg2.csv", sep='\t')
-    # opt_df = pd.read_csv("./results/egg/results_wav.csv", sep='\t')
-    opt_df = pd.read_csv("./results/spe10/results_spe_wav.csv", sep='\t')
+    hf_path = "./results/spe10/results_spe_ori.csv"
+    # hf_path = "./results/egg/results_hf.csv"
+    # hf_path = "./results/egg/results_orig_egg2.csv"
+    # opt_path = "./results/egg/results_wav.csv"
+    opt_path = "./results/spe10/results_spe_wav.csv"
+
+    if '--follow' in sys.argv:
+        LiveMonitor(opt_path, refresh=5.).run()
+        sys.exit()
 
     # Crea plot optimization
-    plot_opt = PlotOpt(opt_df, hf_df, restore_npv=True)
+    plot_opt = PlotOpt.from_csv(opt_path, hf_path, restore_npv=True)
     plot_opt.opt_history_ori()
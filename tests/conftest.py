@@ -0,0 +1,49 @@
+""" Fixtures of the tests. """
+import numpy as np
+import pytest
+from util.backend import SyntheticBackend
+from util.simulate import Simulation
+
+
+def reservoir_config(nb_prod=2, nb_inj=1, nb_cycles=3):
+    """ Reservoir parameters of a small synthetic field."""
+    return {'template': ['synthetic.dat'], 'original': 'synthetic.dat',
+            'max_plat_prod': 1, 'max_plat_inj': 1,
+            'max_rate_prod': 1., 'max_rate_inj': 1.,
+            'nb_prod': nb_prod, 'nb_inj': nb_inj, 'nb_cycles': nb_cycles,
+            'run_folder': False}
+
+
+def controls(nb_controls, config=None, seed=0):
+    """ Random control vectors of the configuration."""
+    config = config or reservoir_config()
+    size = (config['nb_prod'] + config['nb_inj']) * config['nb_cycles']
+    return np.random.default_rng(seed).uniform(size=(nb_controls, size))
+
+
+def reference_npv(batch, config=None, backend=None):
+    """ Net present values computed in this process."""
+    config = config or reservoir_config()
+    backend = backend or SyntheticBackend()
+    return np.array([backend.run(control, config['template'][0], False,
+                                 config).npv for control in batch])
+
+
+@pytest.fixture
+def simulation(tmp_path):
+    """ Factory of simulations on the synthetic backend, writing their
+    cache and restart files in the test folder."""
+    created = []
+
+    def _create(backend=None, **kwargs):
+        kwargs.setdefault('cache_dir', str(tmp_path / 'cache'))
+        kwargs.setdefault('restart_dir', str(tmp_path / 'restart'))
+        kwargs.setdefault('pool_size', 2)
+        sim = Simulation(reservoir_config(),
+                         backend=backend or SyntheticBackend(), **kwargs)
+        created.append(sim)
+        return sim
+
+    yield _create
+    for sim in created:
+        sim.close()
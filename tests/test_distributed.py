@@ -0,0 +1,117 @@
+""" Tests of the remote workers of the coordinator. """
+import time
+import socket
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import Client
+import pytest
+from util.distributed import Coordinator, start_local_workers
+from util.evaluator import TaskCancelled
+
+
+def _add(config, value):
+    """ Task of the remote workers."""
+    return config + value
+
+
+def _sleep(config, seconds):
+    """ Long task of the remote workers."""
+    time.sleep(seconds)
+    return seconds
+
+
+def _wait_workers(coordinator, nb_workers, timeout=30.):
+    """ Wait until the workers are registered."""
+    deadline = time.monotonic() + timeout
+    while len(coordinator.workers) < nb_workers:
+        assert time.monotonic() < deadline, 'workers did not register'
+        time.sleep(0.05)
+
+
+def _close(coordinator, timeout=30.):
+    """ Close the coordinator, failing instead of hanging."""
+    thread = threading.Thread(target=coordinator.close, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'close() did not return'
+
+
+def test_workers_run_the_tasks():
+    coordinator = Coordinator(heartbeat=0.5)
+    procs = start_local_workers(coordinator, 2)
+    try:
+        _wait_workers(coordinator, 2)
+        bound = coordinator.bind(_add, 10)
+        assert dict(bound.map_unordered(range(6))) == \
+            {index: 10 + index for index in range(6)}
+    finally:
+        _close(coordinator)
+    for proc in procs:
+        proc.join(10)
+
+
+def test_cancel_fails_the_running_task():
+    coordinator = Coordinator(heartbeat=0.5)
+    procs = start_local_workers(coordinator, 1)
+    try:
+        _wait_workers(coordinator, 1)
+        bound = coordinator.bind(_sleep, None)
+        running = bound.submit(3.)
+        queued = bound.submit(3.)
+        while not running.running():
+            time.sleep(0.01)
+        assert bound.cancel(queued)
+        assert bound.cancel(running)
+        with pytest.raises(TaskCancelled):
+            running.result(timeout=1)
+        # The worker finishes the remote run before the next task
+        assert bound.submit(0.).result(timeout=30) == 0.
+    finally:
+        _close(coordinator)
+    for proc in procs:
+        proc.join(10)
+
+
+def test_wrong_authkey_does_not_stop_the_registration():
+    coordinator = Coordinator(authkey=b'secret', heartbeat=0.5)
+    try:
+        with pytest.raises(mp.AuthenticationError):
+            Client(coordinator.address, authkey=b'wrong')
+        # A connection closed before the handshake, like a port scan
+        Client(coordinator.address).close()
+        procs = start_local_workers(coordinator, 2)
+        _wait_workers(coordinator, 2)
+        bound = coordinator.bind(_add, 1)
+        assert bound.submit(2).result(timeout=30) == 3
+    finally:
+        _close(coordinator)
+    for proc in procs:
+        proc.join(10)
+
+
+def test_silent_client_does_not_stop_the_registration():
+    coordinator = Coordinator(heartbeat=0.5, handshake_timeout=1.)
+    silent = socket.create_connection(coordinator.address)
+    try:
+        procs = start_local_workers(coordinator, 1)
+        _wait_workers(coordinator, 1, timeout=5.)
+        bound = coordinator.bind(_add, 1)
+        assert bound.submit(2).result(timeout=30) == 3
+        # The silent connection is dropped once its handshake expires
+        silent.settimeout(10.)
+        while silent.recv(1024):
+            pass
+    finally:
+        _close(coordinator)
+        silent.close()
+    for proc in procs:
+        proc.join(10)
+
+
+def test_close_with_a_silent_client():
+    coordinator = Coordinator(heartbeat=0.5)
+    silent = socket.create_connection(coordinator.address)
+    try:
+        _close(coordinator, timeout=5.)
+    finally:
+        silent.close()
@@ -0,0 +1,54 @@
+""" Tests of the streaming ensemble statistics. """
+import numpy as np
+import pytest
+from util.ensemble import EnsembleStats
+
+PROBS = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def _stream(realizations, chunk_size=1000, **kwargs):
+    """ Statistics of the realizations added in chunks."""
+    stats = EnsembleStats(**kwargs)
+    for start in range(0, len(realizations), chunk_size):
+        stats.update(realizations[start:start + chunk_size])
+    return stats
+
+
+@pytest.mark.parametrize('bins', [10, 50, 200])
+@pytest.mark.parametrize('distribution', ['normal', 'lognormal'])
+def test_quantiles_match_the_exact_ones(bins, distribution):
+    realizations = getattr(np.random.default_rng(0), distribution)(
+        size=(20000, 3))
+    stats = _stream(realizations, bins=bins)
+    for prob in PROBS:
+        estimate = stats.quantile(prob)
+        rank = (realizations <= estimate).mean(axis=0)
+        assert np.abs(rank - prob).max() < 0.1 / bins + 0.005, prob
+    if bins >= 50:
+        np.testing.assert_allclose(stats.quantile(0.99),
+                                   np.quantile(realizations, 0.99, axis=0),
+                                   rtol=0.05)
+
+
+def test_the_top_bins_are_filled():
+    realizations = np.random.default_rng(1).normal(size=(20000, 2))
+    stats = _stream(realizations, bins=10)
+    counts = stats._counts.reshape(2, -1)
+    # Inner bins of the warmup range, by probability of their edges
+    probs = np.diff(0.5 - 0.5 * np.cos(np.linspace(0., np.pi, 11)))
+    np.testing.assert_allclose(counts[:, 1:-1] / 20000,
+                               np.tile(probs, (2, 1)), atol=0.03)
+    assert counts.sum() == 2 * 20000
+
+
+def test_quantiles_are_exact_before_the_warmup():
+    realizations = np.random.default_rng(2).lognormal(size=(50, 4))
+    stats = _stream(realizations, chunk_size=7)
+    np.testing.assert_allclose(stats.quantile(0.3),
+                               np.quantile(realizations, 0.3, axis=0))
+    np.testing.assert_allclose(stats.mean, realizations.mean(axis=0))
+
+
+def test_constant_cells():
+    frame = _stream(np.full((300, 3), 2.)).frame()
+    assert (frame.to_numpy() == 2.).all()
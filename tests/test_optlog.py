@@ -0,0 +1,42 @@
+""" Tests of the optimization log reader. """
+import numpy as np
+import pandas as pd
+import pytest
+from util.optlog import parse_vectors, read_log
+
+
+def _write_log(path):
+    """ Small log with string, numeric and vector columns."""
+    pd.DataFrame({'fob_c': [-1.5, -2.5], 'opt_level': [0, 1],
+                  'status': ['ok', 'stop'],
+                  'x_c': ['[0.1 0.2]', '[0.3 0.4]']}).to_csv(
+        path, sep='\t', index=False)
+
+
+def test_sidecar_round_trip(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    _write_log(path)
+    frame, vectors = read_log(path)
+    cached, cached_vectors = read_log(path)
+    assert list(cached['status']) == ['ok', 'stop']
+    np.testing.assert_array_equal(cached['fob_c'], frame['fob_c'])
+    np.testing.assert_array_equal(cached_vectors['x_c'], vectors['x_c'])
+
+
+def test_unreadable_sidecar_parses_the_log(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    _write_log(path)
+    read_log(path)
+    with open(path + '.npz', 'wb') as file:
+        file.write(b'not an archive')
+    frame, vectors = read_log(path)
+    assert list(frame['opt_level']) == [0, 1]
+    np.testing.assert_array_equal(vectors['x_c'], [[0.1, 0.2], [0.3, 0.4]])
+    assert list(read_log(path)[0]['status']) == ['ok', 'stop']
+
+
+def test_vectors_of_different_widths_raise():
+    np.testing.assert_array_equal(parse_vectors(['[1 2 3]', '[ 4 5  6]']),
+                                  [[1, 2, 3], [4, 5, 6]])
+    with pytest.raises(ValueError):
+        parse_vectors(['[1 2 3]', '[4]'])
@@ -0,0 +1,23 @@
+""" Tests of the render cache fingerprints. """
+import os
+import numpy as np
+from util.rendercache import RenderCache
+
+
+def test_fingerprint_follows_the_files_read_by_the_methods(tmp_path,
+                                                           monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = RenderCache()
+    spec = {'models': {}}
+    job = {'method': 'npv_boxplot', 'output': 'box.eps',
+           'args': {'path': 'ensemble.npy'}}
+    np.save('npv.npy', np.zeros((2, 4)))
+    np.save('ensemble.npy', np.zeros((2, 4)))
+    first = cache.fingerprint(job, spec)
+    assert cache.fingerprint(job, spec) == first
+    np.save('npv.npy', np.ones((3, 4)))
+    second = cache.fingerprint(job, spec)
+    assert second != first
+    np.save('ensemble.npy', np.ones((3, 4)))
+    os.utime('ensemble.npy', ns=(1, 1))
+    assert cache.fingerprint(job, spec) != second
@@ -0,0 +1,64 @@
+""" Tests of the cycle prefix restarts. """
+import os
+import numpy as np
+from util.backend import SyntheticBackend, SimulationError
+from util.restart import RestartTree
+from conftest import controls, reference_npv
+
+
+class LostRestartBackend(SyntheticBackend):
+
+    """ Synthetic backend whose restart files disappear."""
+
+    def restart(self, control, template, restore_file, res_param,
+                nb_cycles, path):
+        raise SimulationError(f"restart file {path} not found")
+
+
+def _shared_prefix(nb_controls, nb_shared=2, seed=0):
+    """ Controls sharing their first cycles."""
+    batch = controls(nb_controls, seed=seed)
+    width = batch.shape[1] // 3
+    batch[:, :nb_shared * width] = batch[0, :nb_shared * width]
+    return batch
+
+
+def test_plan_touches_the_stored_prefixes(tmp_path):
+    tree = RestartTree(str(tmp_path), max_entries=2)
+    batch = controls(3)
+    prefixes = [tree.prefixes(control, 3, 'digest') for control in batch]
+    for index, addresses in enumerate(prefixes):
+        with open(tree.path(addresses[0]), 'w'):
+            pass
+        os.utime(tree.path(addresses[0]), (index, index))
+    # The oldest file is reused, so the next one is evicted instead
+    plan, missing = tree.plan(batch[:1], 3, 'digest')
+    assert plan == [(1, prefixes[0][0])]
+    assert not missing
+    assert tree.hits == 1
+    tree.evict()
+    assert prefixes[0][0] in tree
+    assert prefixes[1][0] not in tree
+    assert prefixes[2][0] in tree
+
+
+def test_shared_prefixes_are_checkpointed(tmp_path):
+    tree = RestartTree(str(tmp_path))
+    plan, missing = tree.plan(_shared_prefix(3), 3, 'digest')
+    assert {length for length, _ in plan} == {2}
+    assert len(missing) == 1
+    assert tree.hits == 0
+
+
+def test_restarts_match_the_full_runs(simulation):
+    batch = _shared_prefix(4)
+    sim = simulation(use_cache=False)
+    np.testing.assert_allclose(sim.npv(batch), reference_npv(batch))
+    assert os.listdir(sim.restarts.restart_dir)
+
+
+def test_failed_restart_runs_from_the_start(simulation):
+    batch = _shared_prefix(3)
+    sim = simulation(backend=LostRestartBackend(), use_cache=False)
+    np.testing.assert_allclose(sim.npv(batch), reference_npv(batch))
+    assert not sim.failures
@@ -0,0 +1,197 @@
+""" Smoke tests of the parallel evaluation on the synthetic backend. """
+import time
+import threading
+import numpy as np
+import pytest
+from util.backend import SyntheticBackend, SimulationError
+from util.evaluator import Evaluator, TaskTimeout, TaskCancelled
+from util.journal import Journal
+from util.retry import RetryPolicy
+from util.scheduler import LicenseScheduler
+from conftest import controls, reference_npv, reservoir_config
+
+
+def _square(config, value):
+    """ Task of the evaluator tests."""
+    return config * value ** 2
+
+
+def _sleep(config, seconds):
+    """ Task outliving its time limit."""
+    time.sleep(seconds)
+    return seconds
+
+
+def _outcomes(backend, nb_runs):
+    """ Failure pattern of a sequence of runs."""
+    config = reservoir_config()
+    outcomes = []
+    for _ in range(nb_runs):
+        try:
+            backend.run(None, 'synthetic.dat', False, config)
+            outcomes.append(True)
+        except SimulationError:
+            outcomes.append(False)
+    return outcomes
+
+
+def test_synthetic_failures_are_reproducible():
+    first = _outcomes(SyntheticBackend(failure_rate=0.5, seed=3), 40)
+    second = _outcomes(SyntheticBackend(failure_rate=0.5, seed=3), 40)
+    other = _outcomes(SyntheticBackend(failure_rate=0.5, seed=4), 40)
+    assert first == second
+    assert first != other
+    assert 0 < sum(first) < 40
+
+
+def test_evaluator_map_unordered():
+    with Evaluator(_square, 2, pool_size=2) as evaluator:
+        results = dict(evaluator.map_unordered(range(10)))
+    assert results == {index: 2 * index ** 2 for index in range(10)}
+
+
+def test_evaluator_timeout_replaces_the_worker():
+    with Evaluator(_sleep, None, pool_size=1) as evaluator:
+        with pytest.raises(TaskTimeout):
+            evaluator.submit(10., timeout=0.5).result(timeout=30)
+        assert evaluator.submit(0.).result(timeout=30) == 0.
+
+
+def _wait_running(future):
+    """ Wait until a task leaves the queues."""
+    deadline = time.monotonic() + 30
+    while not future.running() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert future.running()
+
+
+def test_cancel_kills_the_running_task():
+    with Evaluator(_sleep, None, pool_size=1) as evaluator:
+        running = evaluator.submit(30.)
+        queued = evaluator.submit(30.)
+        _wait_running(running)
+        assert evaluator.cancel(queued)
+        assert queued.cancelled()
+        start = time.monotonic()
+        assert evaluator.cancel(running)
+        with pytest.raises(TaskCancelled):
+            running.result(timeout=30)
+        assert time.monotonic() - start < 10
+        assert evaluator.submit(0.).result(timeout=30) == 0.
+        assert not evaluator.cancel(running)
+
+
+def test_cancel_returns_the_license():
+    scheduler = LicenseScheduler(2)
+    with Evaluator(_sleep, None, pool_size=1) as evaluator:
+        running = scheduler.submit(evaluator, (30.,))
+        # Holds a license, queued in the evaluator
+        waiting = scheduler.submit(evaluator, (30.,))
+        queued = scheduler.submit(evaluator, (30.,))
+        _wait_running(running)
+        assert scheduler.cancel(queued)
+        assert scheduler.cancel(waiting)
+        assert scheduler.cancel(running)
+        for future in (running, waiting):
+            with pytest.raises(TaskCancelled):
+                future.result(timeout=30)
+        assert scheduler.running == 0
+        assert scheduler.submit(evaluator, (0.,)).result(timeout=30) == 0.
+
+
+def test_npv_matches_the_serial_runs(simulation):
+    batch = controls(6)
+    sim = simulation(use_cache=False, restart_dir=None)
+    np.testing.assert_allclose(sim.npv(batch), reference_npv(batch))
+    assert sim.num_simulations == 6
+
+
+def test_npv_cache_skips_simulated_controls(simulation):
+    batch = controls(4)
+    sim = simulation(restart_dir=None)
+    first = sim.npv(batch)
+    runs = sim.num_simulations
+    np.testing.assert_allclose(sim.npv(batch), first)
+    assert sim.num_simulations == runs
+
+
+def test_scheduler_respects_the_license_budget(simulation):
+    scheduler = LicenseScheduler(1)
+    running = []
+    stop = threading.Event()
+
+    def _watch():
+        while not stop.is_set():
+            running.append(scheduler.running)
+            time.sleep(0.001)
+
+    watcher = threading.Thread(target=_watch)
+    watcher.start()
+    batch = controls(6)
+    sim = simulation(backend=SyntheticBackend(latency=0.02),
+                     use_cache=False, restart_dir=None,
+                     scheduler=scheduler, pool_size=3)
+    try:
+        npv = sim.npv(batch)
+    finally:
+        stop.set()
+        watcher.join()
+    np.testing.assert_allclose(npv, reference_npv(batch))
+    assert max(running) <= 1
+    assert len(scheduler.waits) == 6
+
+
+def test_failures_are_retried(simulation):
+    batch = controls(8)
+    sim = simulation(backend=SyntheticBackend(failure_rate=0.3, seed=1),
+                     use_cache=False, restart_dir=None,
+                     retry=RetryPolicy(retries=20))
+    np.testing.assert_allclose(
+        sim.npv(batch), reference_npv(batch, backend=SyntheticBackend(seed=1)))
+    assert not sim.failures
+    assert 'retried' in set(sim.telemetry.frame()['status'])
+
+
+def test_exhausted_retries_give_nan(simulation):
+    batch = controls(3)
+    sim = simulation(backend=SyntheticBackend(failure_rate=1.),
+                     use_cache=False, restart_dir=None,
+                     retry=RetryPolicy(retries=1))
+    npv = sim.npv(batch)
+    assert np.isnan(npv).all()
+    assert sorted(sim.failures) == [0, 1, 2]
+    assert all(isinstance(error, SimulationError)
+               for error in sim.failures.values())
+
+
+def test_speculative_runs_keep_one_result(simulation):
+    batch = controls(6)
+    sim = simulation(backend=SyntheticBackend(latency=0.05),
+                     use_cache=False, restart_dir=None,
+                     retry=RetryPolicy(speculative=0.5), pool_size=4)
+    np.testing.assert_allclose(sim.npv(batch), reference_npv(batch))
+    # Every copy, finished or killed, is recorded once
+    assert len(sim.telemetry) == sim.num_simulations
+
+
+def test_journal_resumes_the_batch(simulation, tmp_path):
+    batch = controls(5)
+    journal = str(tmp_path / 'batch.jsonl')
+    first = simulation(use_cache=False, restart_dir=None)
+    expected = first.npv(batch[:3], journal=journal)
+    second = simulation(use_cache=False, restart_dir=None)
+    npv = second.npv(batch, journal=journal)
+    np.testing.assert_allclose(npv[:3], expected)
+    np.testing.assert_allclose(npv, reference_npv(batch))
+    assert second.num_simulations == 2
+
+
+def test_journal_keeps_the_entry_after_a_cut_line(tmp_path):
+    path = str(tmp_path / 'batch.jsonl')
+    with Journal(path) as log:
+        log.append('first', 1.)
+    with open(path, 'a') as file:
+        file.write('{"key": "cut", "np')
+    with Journal(path) as log:
+        log.append('second', 2.)
+    assert Journal(path).entries == {'first': 1., 'second': 2.}
@@ -0,0 +1,46 @@
+""" Tests of the columnar results store. """
+import numpy as np
+import pandas as pd
+import pytest
+from util.store import ResultsStore
+
+
+def _production(nb_rows=6):
+    """ Production frame with labels, dates and a time zone."""
+    return pd.DataFrame({
+        'time': np.arange(nb_rows, dtype=float),
+        'date': pd.date_range('2020-01-01', periods=nb_rows, freq='D'),
+        'stamp': pd.date_range('2020-01-01', periods=nb_rows, freq='h',
+                               tz='Europe/Oslo'),
+        'well': pd.Series(['P1', 'P2', 'I1'] * (nb_rows // 3),
+                          dtype=object),
+        'oil': np.linspace(0., 1., nb_rows)})
+
+
+@pytest.mark.parametrize('index', [
+    None,
+    pd.RangeIndex(1, 7),
+    pd.date_range('2021-01-01', periods=6, freq='D', name='day'),
+    pd.MultiIndex.from_product([['A', 'B'], [0, 1, 2]],
+                               names=['field', 'step'])])
+def test_pickle_round_trip(tmp_path, index):
+    frame = _production()
+    if index is not None:
+        frame.index = index
+    frame.to_pickle(tmp_path / 'in.pkl')
+    store = ResultsStore(str(tmp_path / 'store'))
+    store.import_pickle(str(tmp_path / 'in.pkl'), 'case', 'model')
+    store.export_pickle(str(tmp_path / 'out.pkl'), 'case', 'model')
+    pd.testing.assert_frame_equal(pd.read_pickle(tmp_path / 'out.pkl'),
+                                  frame, check_freq=False)
+
+
+def test_dates_are_stored_as_datetime64(tmp_path):
+    store = ResultsStore(str(tmp_path), time_column='date')
+    store.write(_production(), 'case', 'model')
+    frame = store.read('case', 'model', columns=['date', 'stamp', 'oil'],
+                       window=(pd.Timestamp('2020-01-02'),
+                               pd.Timestamp('2020-01-04')))
+    assert frame['date'].dtype.kind == 'M'
+    assert str(frame['stamp'].dt.tz) == 'Europe/Oslo'
+    np.testing.assert_allclose(frame['oil'], [0.2, 0.4, 0.6])
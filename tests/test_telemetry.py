@@ -0,0 +1,54 @@
+""" Tests of the per-task telemetry. """
+import os
+import sys
+import time
+import subprocess
+import pytest
+from util.evaluator import Evaluator
+from util.telemetry import PeakMemory
+
+MB = 1 << 20
+
+pytestmark = pytest.mark.skipif(
+    not os.access('/proc/self/clear_refs', os.W_OK),
+    reason='the peak of a task is only measured on Linux')
+
+
+def test_peak_is_the_task_peak():
+    with PeakMemory() as memory:
+        block = bytearray(200 * MB)
+        block[::4096] = b'x' * len(block[::4096])
+        del block
+    assert memory.peak >= 200 * MB
+    with PeakMemory() as memory:
+        pass
+    assert memory.peak < 150 * MB
+
+
+def test_peak_includes_the_child_processes():
+    script = ("block = bytearray(150 << 20)\n"
+              "block[::4096] = b'x' * len(block[::4096])\n"
+              "import time; time.sleep(1)\n")
+    with PeakMemory(interval=0.05) as memory:
+        subprocess.run([sys.executable, '-c', script], check=True)
+    assert memory.peak >= 150 * MB
+
+
+_BLOCKS = []
+
+
+def _hold(config, size):
+    """ Task keeping memory in its worker after it returns."""
+    block = bytearray(size)
+    block[::4096] = b'x' * len(block[::4096])
+    _BLOCKS.append(block)
+    return len(_BLOCKS)
+
+
+def test_peak_leaves_out_the_pool_workers():
+    with Evaluator(_hold, None, pool_size=2) as evaluator:
+        for future in [evaluator.submit(200 * MB) for _ in range(2)]:
+            future.result(timeout=60)
+        with PeakMemory(interval=0.05) as memory:
+            time.sleep(0.2)
+    assert memory.peak < 150 * MB
@@ -0,0 +1,258 @@
+""" Simulator backends. """
+import os
+import time
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+class SimulationError(RuntimeError):
+
+    """ The simulator failed to run the model."""
+
+
+class Backend:
+
+    """ Interface of the reservoir simulators.
+
+    A backend runs one control vector and returns a model object
+    exposing at least the attributes ``npv`` and ``prod``.
+    Backends are shipped to the worker processes, so they must be
+    picklable.
+
+    Backends able to restart a run from a checkpoint set
+    ``supports_restart`` and implement :meth:`checkpoint` and
+    :meth:`restart`.
+    """
+
+    supports_restart = False
+
+    def key(self):
+        """ Identity of the backend used in the result cache keys."""
+        return type(self).__name__
+
+    def run(self, control, template, restore_file, res_param):
+        """ Simulate the control and return the model."""
+        raise NotImplementedError
+
+    def checkpoint(self, control, template, restore_file, res_param,
+                   nb_cycles, path):
+        """ Simulate the first nb_cycles control cycles and write a
+        restart file at path."""
+        raise NotImplementedError
+
+    def restart(self, control, template, restore_file, res_param,
+                nb_cycles, path):
+        """ Continue the restart file at path with the cycles of the
+        control after nb_cycles and return the full model."""
+        raise NotImplementedError
+
+
+class PyMEXBackend(Backend):
+
+    """ Commercial simulator IMEX through PyMEX.
+
+    PyMEX does not expose restarts from a checkpoint (restore_file only
+    reloads the results of a finished run), so every run starts at t=0.
+    """
+
+    def run(self, control, template, restore_file, res_param):
+        """ Run PyMEX."""
+        # Imported here so the package works without PyMEX installed
+        from PyMEX.utilits.ManiParam import PyMEX
+        return PyMEX(control, template, restore_file, res_param)
+
+
+class SyntheticModel:
+
+    """ Results of the synthetic backend, mimicking PyMEX."""
+
+    def __init__(self, control, template, prod, npv):
+        self.control = control
+        self.tpl = template
+        self.run_path = '.'
+        self.prod = prod
+        self.npv = npv
+
+
+class SyntheticBackend(Backend):
+
+    """ Deterministic fast stand-in for the simulator.
+
+    Produces a plausible production frame and net present value
+    from the controls, so the parallel evaluation and the plotting
+    pipeline can be exercised on machines without licenses.
+    """
+
+    supports_restart = True
+
+    def __init__(self, latency=0., failure_rate=0., seed=0, days=7300,
+                 report_step=30):
+        """
+
+        Parameters
+        ----------
+        latency: float
+            Seconds each run sleeps, standing for the simulator time.
+        failure_rate: float
+            Probability in [0, 1] that a run raises SimulationError.
+            The failures are drawn from a generator seeded with seed,
+            so the same sequence of runs in a process fails at the
+            same runs.
+        seed: int
+            Seed of the synthetic reservoir properties and of the
+            failures.
+        days: int
+            Simulated period in days.
+        report_step: int
+            Days between reported time steps.
+
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.days = days
+        self.report_step = report_step
+        self._failures = np.random.default_rng(seed)
+
+    def key(self):
+        """ Identity of the backend: latency and failures do not
+        change the results."""
+        return f"SyntheticBackend({self.seed}, {self.days}, " \
+               f"{self.report_step})"
+
+    def _rng(self, template):
+        """ Random generator of the template properties."""
+        digest = hashlib.sha256(f"{self.seed}{template}".encode())
+        return np.random.default_rng(int(digest.hexdigest()[:8], 16))
+
+    def _controls(self, control, res_param):
+        """ Controls as an array (nb_cycles, nb_wells)."""
+        nb_wells = res_param['nb_prod'] + res_param['nb_inj']
+        nb_cycles = res_param['nb_cycles']
+        if control is None or np.asarray(control).dtype == object:
+            return np.ones((nb_cycles, nb_wells))
+        return np.asarray(control, dtype=float).reshape(nb_cycles,
+                                                        nb_wells)
+
+    def _simulate(self, controls, template, res_param, state=None,
+                  first_cycle=0, last_cycle=None):
+        """ March the cycles from first_cycle to last_cycle.
+
+        Returns the per-step rates of the simulated cycles and the
+        state at the end of the last one.
+        """
+        nb_prod = res_param['nb_prod']
+        nb_cycles = res_param['nb_cycles']
+        rate_prod = res_param.get('max_rate_prod', 1.)
+        rate_inj = res_param.get('max_rate_inj', 1.)
+        rng = self._rng(template)
+        reserve = rng.uniform(2., 4., nb_prod) * rate_prod * self.days / 4
+        gor = rng.uniform(0.5, 1.5)
+        if state is None:
+            state = {'cum_liq': np.zeros(nb_prod), 'cum_inj': 0.}
+        times = np.arange(0, self.days + 1, self.report_step)
+        cycle = np.minimum(times * nb_cycles // (self.days + 1),
+                           nb_cycles - 1)
+        if last_cycle is None:
+            last_cycle = nb_cycles
+        steps = []
+        for icycle in range(first_cycle, last_cycle):
+            prod = controls[icycle, :nb_prod] * rate_prod
+            inj = controls[icycle, nb_prod:].mean() * rate_inj
+            support = 0.5 + 0.5 * inj / max(rate_inj, 1e-12)
+            for time_step in times[cycle == icycle]:
+                fraction = np.exp(-state['cum_liq'] / reserve) * support
+                oil = prod * fraction
+                water = prod - oil
+                state['cum_liq'] = state['cum_liq'] + prod * self.report_step
+                state['cum_inj'] += inj * self.report_step
+                steps.append((time_step, oil, water, inj * nb_prod, gor))
+        return steps, state
+
+    def _frame(self, steps, res_param):
+        """ Production frame from the per-step rates."""
+        nb_prod = res_param['nb_prod']
+        time_steps = np.array([step[0] for step in steps], dtype=float)
+        oil = np.array([step[1] for step in steps])
+        water = np.array([step[2] for step in steps])
+        inj = np.array([step[3] for step in steps])
+        gor = steps[0][4] if steps else 1.
+        cum_op_wells = np.cumsum(oil, axis=0) * self.report_step
+        cum_op = cum_op_wells.sum(axis=1)
+        cum_wp = np.cumsum(water.sum(axis=1)) * self.report_step
+        cum_wi = np.cumsum(inj) * self.report_step
+        voidage = cum_op + cum_wp - cum_wi
+        scale = max(np.abs(voidage).max(initial=0.), 1.)
+        frame = {'time': time_steps,
+                 'cum_op': cum_op,
+                 'cum_gp': gor * cum_op * 1e3,
+                 'cum_wp': cum_wp,
+                 'cum_wi': cum_wi,
+                 'pres': 4000. - 1e3 * voidage / scale,
+                 'prod1_or': oil[:, 0]}
+        for well in range(nb_prod):
+            frame[f'cum_op_p{well + 1}'] = cum_op_wells[:, well]
+            frame[f'cum_or_p{well + 1}'] = oil[:, well]
+        return pd.DataFrame(frame)
+
+    def _npv(self, prod, res_param):
+        """ Discounted cash flow in millions, with the PyMEX sign
+        convention of a minimization problem."""
+        prices = res_param.get('prices', {})
+        oil_price = prices.get('oil', 60.)
+        water_cost = prices.get('water', 5.)
+        inj_cost = prices.get('injection', 2.)
+        rate = res_param.get('discount_rate', 0.1)
+        cash = (oil_price * np.diff(prod['cum_op'], prepend=0.)
+                - water_cost * np.diff(prod['cum_wp'], prepend=0.)
+                - inj_cost * np.diff(prod['cum_wi'], prepend=0.))
+        discount = (1 + rate) ** (prod['time'].values / 365.)
+        return -1e-6 * float(np.sum(cash / discount))
+
+    def _wait_or_fail(self):
+        """ Sleep the latency and draw a failure."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and \
+                self._failures.random() < self.failure_rate:
+            raise SimulationError('synthetic simulator failure')
+
+    def run(self, control, template, restore_file, res_param):
+        """ Simulate the control."""
+        self._wait_or_fail()
+        controls = self._controls(control, res_param)
+        steps, _ = self._simulate(controls, template, res_param)
+        return self._model(control, template, steps, res_param)
+
+    def _model(self, control, template, steps, res_param):
+        """ Model of the simulated steps."""
+        prod = self._frame(steps, res_param)
+        return SyntheticModel(control, template, prod,
+                              self._npv(prod, res_param))
+
+    def checkpoint(self, control, template, restore_file, res_param,
+                   nb_cycles, path):
+        """ Simulate the first cycles and pickle the steps and the
+        state at path."""
+        self._wait_or_fail()
+        controls = self._controls(control, res_param)
+        steps, state = self._simulate(controls, template, res_param,
+                                      last_cycle=nb_cycles)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump((steps, state), file)
+        os.replace(tmp_path, path)
+        return path
+
+    def restart(self, control, template, restore_file, res_param,
+                nb_cycles, path):
+        """ Continue the pickled run with the remaining cycles."""
+        self._wait_or_fail()
+        with open(path, 'rb') as file:
+            steps, state = pickle.load(file)
+        controls = self._controls(control, res_param)
+        tail, _ = self._simulate(controls, template, res_param, state,
+                                 first_cycle=nb_cycles)
+        return self._model(control, template, steps + tail, res_param)
@@ -0,0 +1,171 @@
+""" On-disk cache of simulation results. """
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+
+
+# Keys of the reservoir configuration that do not change the
+# simulation results and therefore stay out of the cache key.
+IGNORED_KEYS = ('run_folder',)
+
+# Content digest of the template files by (path, size, mtime)
+_FILE_DIGESTS = {}
+
+
+def file_digest(path):
+    """ Digest of the content of a file, None when it is not one.
+    The digest is computed again only when the size or the
+    modification time of the file changes."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    stamp = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if stamp not in _FILE_DIGESTS:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                hasher.update(block)
+        _FILE_DIGESTS[stamp] = hasher.hexdigest()
+    return _FILE_DIGESTS[stamp]
+
+
+def config_digest(backend, template, restore_file, res_param):
+    """ Digest of everything besides the control that defines a run,
+    including the content of the template deck, so editing the deck
+    invalidates its cached results."""
+    relevant = {key: value for key, value in res_param.items()
+                if key not in IGNORED_KEYS}
+    config = {'backend': backend.key(),
+              'template': template,
+              'template_digest': file_digest(template),
+              'restore_file': restore_file,
+              'res_param': relevant}
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def control_key(control, digest, kind='npv'):
+    """ Content address of a control vector under a configuration.
+
+    Parameters
+    ----------
+    control: array_like or None
+        Normalized well controls. None means the template schedule.
+    digest: str
+        Configuration digest from :func:`config_digest`.
+    kind: str
+        Kind of cached value, e.g. 'npv' or 'model'.
+
+    """
+    hasher = hashlib.sha256()
+    hasher.update(kind.encode())
+    hasher.update(digest.encode())
+    if control is None:
+        hasher.update(b'none')
+    else:
+        control = np.ascontiguousarray(control, dtype=np.float64)
+        hasher.update(str(control.shape).encode())
+        hasher.update(control.tobytes())
+    return hasher.hexdigest()
+
+
+class NpvCache:
+
+    """ Content-addressed cache with least recently used eviction."""
+
+    def __init__(self, cache_dir='.pymex_cache', max_entries=10000):
+        """
+
+        Parameters
+        ----------
+        cache_dir: str
+            Folder where the entries are stored.
+        max_entries: int
+            Maximum number of entries kept on disk. The least
+            recently used entries are removed first.
+
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._count = len(self._entries())
+
+    def _path(self, key):
+        """ File of the entry."""
+        return os.path.join(self.cache_dir, key[:2], key + '.pkl')
+
+    def _entries(self):
+        """ List all entry files."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            entries.extend(os.path.join(root, name) for name in files
+                           if name.endswith('.pkl'))
+        return entries
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        """ Return the cached value or default."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        # Touch the entry to mark it as recently used
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """ Store the value. Values that cannot be pickled are
+        silently skipped."""
+        try:
+            data = pickle.dumps(value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        path = self._path(key)
+        is_new = not os.path.exists(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        if is_new:
+            self._count += 1
+            if self._count > self.max_entries:
+                self.evict()
+
+    def evict(self):
+        """ Remove the least recently used entries above the limit."""
+        entries = self._entries()
+        excess = len(entries) - self.max_entries
+        if excess > 0:
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._count = min(len(entries), self.max_entries)
+
+    def clear(self):
+        """ Remove every entry."""
+        for path in self._entries():
+            os.remove(path)
+        self._count = 0
+
+    def stats(self):
+        """ Hit and miss statistics."""
+        total = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.,
+                'entries': self._count}
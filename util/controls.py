@@ -0,0 +1,47 @@
+""" Helpers for batches of control vectors. """
+import numpy as np
+
+
+def unique_controls(controls, tol=0.):
+    """ Unique control vectors of a batch.
+
+    Parameters
+    ----------
+    controls: array_like
+        Control vectors, one per row.
+    tol: float
+        Controls closer than tol, in max norm, to an earlier unique
+        control are merged into it. Zero merges exact repeats only.
+
+    Returns
+    -------
+    unique: numpy.ndarray
+        Unique rows, in order of first appearance.
+    inverse: numpy.ndarray
+        Index of the unique row of each control.
+
+    """
+    controls = np.atleast_2d(np.asarray(controls, dtype=float))
+    _, first, inverse = np.unique(controls, axis=0, return_index=True,
+                                  return_inverse=True)
+    # Keep the order of first appearance
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    unique, inverse = controls[first[order]], rank[inverse.ravel()]
+    if tol <= 0 or len(unique) < 2:
+        return unique, inverse
+    merged = np.empty(len(unique), dtype=int)
+    kept = np.empty_like(unique)
+    nb_kept = 0
+    for index, row in enumerate(unique):
+        if nb_kept:
+            distance = np.abs(kept[:nb_kept] - row).max(axis=1)
+            closest = np.argmin(distance)
+            if distance[closest] <= tol:
+                merged[index] = closest
+                continue
+        kept[nb_kept] = row
+        merged[index] = nb_kept
+        nb_kept += 1
+    return kept[:nb_kept], merged[inverse]
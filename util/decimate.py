@@ -0,0 +1,110 @@
+""" Decimation of long time series before plotting. """
+import numpy as np
+from util.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+
+def lttb(x_data, y_data, nb_points):
+    """ Largest triangle three buckets downsampling.
+
+    Keeps the first and last points and, in each of nb_points - 2
+    buckets, the point forming the largest triangle with the point
+    kept in the previous bucket and the mean of the next one.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted indices of the points kept.
+
+    """
+    size = len(x_data)
+    if nb_points >= size or nb_points < 3:
+        return np.arange(size)
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    edges = np.linspace(1, size - 1, nb_points - 1).astype(int)
+    # Mean of the bucket following each bucket, the last point for
+    # the last bucket
+    counts = np.diff(np.append(edges, size))
+    x_means = np.add.reduceat(x_data, edges) / counts
+    y_means = np.add.reduceat(y_data, edges) / counts
+    x_means[-1], y_means[-1] = x_data[-1], y_data[-1]
+    kept = np.empty(nb_points, dtype=int)
+    kept[0] = 0
+    kept[-1] = size - 1
+    for bucket in range(nb_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        x_mean, y_mean = x_means[bucket + 1], y_means[bucket + 1]
+        x_prev, y_prev = x_data[kept[bucket]], y_data[kept[bucket]]
+        area = np.abs((x_prev - x_mean) * (y_data[start:end] - y_prev)
+                      - (x_prev - x_data[start:end]) * (y_mean - y_prev))
+        kept[bucket + 1] = start + np.argmax(area)
+    return kept
+
+
+def minmax(x_data, y_data, nb_points):
+    """ Min/max bucketing: the extreme points of nb_points / 2 equal
+    buckets, with the first and last points.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted indices of the points kept.
+
+    """
+    size = len(x_data)
+    if nb_points >= size or nb_points < 4:
+        return np.arange(size)
+    y_data = np.asarray(y_data, dtype=float)
+    bucket = np.arange(size) * (nb_points // 2) // size
+    order = np.lexsort((y_data, bucket))
+    starts = np.flatnonzero(np.diff(bucket[order], prepend=-1))
+    ends = np.append(starts[1:], size) - 1
+    kept = np.concatenate(([0, size - 1], order[starts], order[ends]))
+    return np.unique(kept)
+
+
+METHODS = {'lttb': lttb, 'minmax': minmax}
+
+
+def single_trace(frame, x_column, by):
+    """ True when x increases strictly within each group, so every
+    group is one trace and needs no aggregation."""
+    if by is None:
+        return bool(frame[x_column].is_monotonic_increasing
+                    and frame[x_column].is_unique)
+    keys = pd.Series(frame[by]).astype('category').cat.codes.to_numpy()
+    x_data = frame[x_column].to_numpy()
+    same = keys[1:] == keys[:-1]
+    ordered = np.all(x_data[1:][same] > x_data[:-1][same])
+    # Each group must also be a single contiguous block
+    return bool(ordered and
+                len(np.unique(keys)) == 1 + np.count_nonzero(~same))
+
+
+def decimate(frame, x_column, y_column, nb_points, by=None,
+             method='lttb'):
+    """ Rows of the frame kept to plot y against x with about
+    nb_points points per group.
+
+    The frame is returned unchanged when a group holds several traces.
+    """
+    if method is None or not single_trace(frame, x_column, by):
+        return frame
+    select = METHODS[method]
+    x_data = frame[x_column].to_numpy()
+    y_data = frame[y_column].to_numpy()
+    if by is None:
+        bounds = [(0, len(frame))]
+    else:
+        keys = pd.Series(frame[by]).astype('category').cat.codes
+        starts = np.flatnonzero(np.diff(keys.to_numpy(), prepend=-1))
+        bounds = zip(starts, np.append(starts[1:], len(frame)))
+    rows = [start + select(x_data[start:end], y_data[start:end],
+                           nb_points)
+            for start, end in bounds]
+    rows = np.concatenate(rows) if rows else np.arange(0)
+    if len(rows) == len(frame):
+        return frame
+    return frame.iloc[rows]
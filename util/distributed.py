@@ -0,0 +1,443 @@
+""" Fan out simulations to worker processes on several nodes.
+
+The coordinator listens on a TCP address. Workers connect, register
+and receive the simulation configuration once, then run one task at a
+time and send heartbeats while they work. Tasks of workers that
+disconnect or stop sending heartbeats are dispatched again.
+
+Start a worker on a node with::
+
+    python -m util.distributed HOST:PORT --authkey KEY
+
+"""
+import os
+import time
+import socket
+import argparse
+import threading
+import itertools
+import collections
+import multiprocessing as mp
+from multiprocessing.connection import (Listener, Client, wait,
+                                        deliver_challenge, answer_challenge)
+from concurrent.futures import Future, as_completed
+from util.evaluator import WorkerLost, TaskTimeout, TaskCancelled
+
+
+def run_worker(address, authkey, name=None):
+    """ Worker loop: register with the coordinator and run tasks
+    until it sends the stop sentinel."""
+    conn = Client(address, authkey=authkey)
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    conn.send(('register', name))
+    heartbeat = conn.recv()
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def _send(message):
+        with lock:
+            conn.send(message)
+
+    def _beat():
+        while not stop.wait(heartbeat):
+            try:
+                _send(('heartbeat',))
+            except OSError:
+                break
+
+    threading.Thread(target=_beat, daemon=True).start()
+    configs = {}
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            if message[0] == 'config':
+                _, version, function, config = message
+                configs = {version: (function, config)}
+                continue
+            _, task_id, version, args = message
+            function, config = configs[version]
+            try:
+                _send(('done', task_id, function(config, *args)))
+            except Exception as exc:
+                _send(('error', task_id, exc))
+    finally:
+        stop.set()
+        conn.close()
+
+
+def _local_worker(address, authkey):
+    """ Entry point of the local worker processes."""
+    run_worker(address, authkey)
+
+
+def start_local_workers(coordinator, nb_workers):
+    """ Start worker processes on this machine, for tests and for
+    single node runs."""
+    procs = []
+    for _ in range(nb_workers):
+        proc = mp.Process(target=_local_worker,
+                          args=(coordinator.address, coordinator.authkey),
+                          daemon=True)
+        proc.start()
+        procs.append(proc)
+    return procs
+
+
+def _shutdown(conn):
+    """ Shut the socket of a connection down, waking up a thread
+    blocked reading it."""
+    try:
+        with socket.socket(fileno=os.dup(conn.fileno())) as sock:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _Bound:
+
+    """ Coordinator bound to a simulation configuration, with the
+    interface of an Evaluator."""
+
+    pool_size = None
+
+    def __init__(self, coordinator, version):
+        self.coordinator = coordinator
+        self.version = version
+
+    def submit(self, *args, timeout=None):
+        """ Schedule function(config, *args) and return a Future."""
+        return self.coordinator.submit(self.version, args, timeout)
+
+    def cancel(self, future):
+        """ Cancel a task, see Coordinator.cancel."""
+        return self.coordinator.cancel(future)
+
+    def map_unordered(self, iterable):
+        """ Submit every item and yield (index, result) pairs in
+        completion order."""
+        futures = {self.submit(item): index
+                   for index, item in enumerate(iterable)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def close(self):
+        """ The workers belong to the coordinator: nothing to stop."""
+
+
+class Coordinator:
+
+    """ Dispatch tasks to registered remote workers."""
+
+    def __init__(self, address=('localhost', 0), authkey=None,
+                 heartbeat=5., max_attempts=3, handshake_timeout=10.):
+        """
+
+        Parameters
+        ----------
+        address: tuple
+            (host, port) to listen on. Port 0 picks a free port.
+        authkey: bytes
+            Shared secret of the workers. A random key is generated
+            when missing.
+        heartbeat: float
+            Seconds between worker heartbeats. A worker silent for
+            three intervals is considered lost.
+        max_attempts: int
+            Number of dispatches of a task before it fails.
+        handshake_timeout: float
+            Seconds a connecting worker has to authenticate and
+            register.
+
+        """
+        self.authkey = authkey or os.urandom(16)
+        self.heartbeat = heartbeat
+        self.max_attempts = max_attempts
+        self.handshake_timeout = handshake_timeout
+        # The handshake is done by a thread of each connection, so a
+        # client with a wrong key or a silent one only loses its own
+        self._listener = Listener(address)
+        self.address = self._listener.address
+        self._lock = threading.Lock()
+        self._configs = {}
+        self._versions = itertools.count()
+        self._tasks = {}
+        self._task_ids = itertools.count()
+        self._pending = collections.deque()
+        self._workers = {}
+        self._closed = False
+        self._wakeup_r, self._wakeup_w = mp.Pipe(duplex=False)
+        self._accept_thread = threading.Thread(target=self._accept,
+                                               daemon=True)
+        self._accept_thread.start()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def workers(self):
+        """ Names of the registered workers."""
+        with self._lock:
+            return [state['name'] for state in self._workers.values()]
+
+    def bind(self, function, config):
+        """ Register a configuration and return an Evaluator-like
+        object submitting function(config, *args) tasks."""
+        with self._lock:
+            version = next(self._versions)
+            self._configs[version] = (function, config)
+        return _Bound(self, version)
+
+    def submit(self, version, args, timeout=None):
+        """ Schedule a task of a bound configuration.
+
+        A task running longer than timeout seconds fails with
+        TaskTimeout. The remote simulation cannot be killed, so its
+        worker stays busy until it finishes and the late result is
+        discarded.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('cannot submit to a closed coordinator')
+            task_id = next(self._task_ids)
+            self._tasks[task_id] = {'future': future, 'version': version,
+                                    'args': args, 'attempts': 0,
+                                    'timeout': timeout, 'deadline': None}
+            self._pending.append(task_id)
+            self._wakeup_w.send(None)
+        return future
+
+    def cancel(self, future):
+        """ Cancel a task. A queued task is dropped and a running one
+        fails with TaskCancelled. As with the time limit, the remote
+        simulation cannot be killed: its worker stays busy until it
+        finishes and the late result is discarded.
+        """
+        if future.cancel():
+            return True
+        with self._lock:
+            task_id = next((task_id for task_id, task in self._tasks.items()
+                            if task['future'] is future), None)
+            if task_id is None:
+                return False
+            del self._tasks[task_id]
+            if task_id in self._pending:
+                self._pending.remove(task_id)
+        future.set_exception(TaskCancelled('task cancelled'))
+        return True
+
+    def _accept(self):
+        """ Accept the connections and authenticate each one in its own
+        thread, so a silent client does not hold the others back."""
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed:
+                    break
+                continue
+            if self._closed:
+                conn.close()
+                break
+            threading.Thread(target=self._register, args=(conn,),
+                             daemon=True).start()
+
+    def _register(self, conn):
+        """ Authenticate and register a worker. A connection failing
+        the authentication or the registration, or not completing them
+        within handshake_timeout seconds, is closed."""
+        expired = threading.Event()
+
+        def _expire():
+            expired.set()
+            _shutdown(conn)
+
+        timer = threading.Timer(self.handshake_timeout, _expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+            _, name = conn.recv()
+            conn.send(self.heartbeat)
+        except Exception:
+            conn.close()
+            return
+        finally:
+            timer.cancel()
+        with self._lock:
+            if self._closed or expired.is_set():
+                conn.close()
+                return
+            self._workers[conn] = {'name': name, 'task': None,
+                                   'version': None,
+                                   'seen': time.monotonic()}
+            self._wakeup_w.send(None)
+
+    def _dispatch(self):
+        """ Send pending tasks to idle workers. Return the tasks
+        failed by workers lost on the way."""
+        finished = []
+        idle = [conn for conn, state in self._workers.items()
+                if state['task'] is None]
+        while idle and self._pending:
+            task_id = self._pending.popleft()
+            task = self._tasks[task_id]
+            if task['attempts'] == 0 and \
+                    not task['future'].set_running_or_notify_cancel():
+                del self._tasks[task_id]
+                continue
+            conn = idle.pop()
+            state = self._workers[conn]
+            task['attempts'] += 1
+            if task['timeout'] is not None:
+                task['deadline'] = time.monotonic() + task['timeout']
+            state['task'] = task_id
+            try:
+                if state['version'] != task['version']:
+                    function, config = self._configs[task['version']]
+                    conn.send(('config', task['version'], function,
+                               config))
+                    state['version'] = task['version']
+                conn.send(('task', task_id, task['version'], task['args']))
+            except OSError:
+                finished.append(self._lost(conn))
+        return finished
+
+    def _lost(self, conn):
+        """ Drop a worker and dispatch its task again."""
+        state = self._workers.pop(conn)
+        conn.close()
+        task = self._tasks.get(state['task'])
+        if task is None:
+            return None
+        task_id = state['task']
+        if task['attempts'] < self.max_attempts:
+            task['deadline'] = None
+            self._pending.appendleft(task_id)
+            return None
+        del self._tasks[task_id]
+        error = WorkerLost(f"task lost {task['attempts']} times, "
+                           f"last on worker {state['name']}")
+        return task['future'], None, error
+
+    def _expire(self):
+        """ Fail the running tasks past their deadline."""
+        now = time.monotonic()
+        expired = [task_id for task_id, task in self._tasks.items()
+                   if task['deadline'] is not None
+                   and task['deadline'] <= now]
+        finished = []
+        for task_id in expired:
+            task = self._tasks.pop(task_id)
+            finished.append((task['future'], None, TaskTimeout(
+                f"task exceeded its time limit of {task['timeout']} s")))
+        return finished
+
+    def _receive(self, conn):
+        """ Handle one worker message; return a finished task."""
+        state = self._workers[conn]
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return self._lost(conn)
+        state['seen'] = time.monotonic()
+        if message[0] == 'heartbeat':
+            return None
+        status, task_id, value = message
+        state['task'] = None
+        task = self._tasks.pop(task_id, None)
+        if task is None or task['future'].done():
+            return None
+        if status == 'done':
+            return task['future'], value, None
+        return task['future'], None, value
+
+    def _loop(self):
+        """ Dispatcher thread."""
+        while True:
+            with self._lock:
+                if self._closed and not (self._tasks and self._workers):
+                    break
+                finished = self._dispatch()
+                conns = list(self._workers)
+                timeout = self.heartbeat
+                deadlines = [task['deadline'] for task in self._tasks.values()
+                             if task['deadline'] is not None]
+                if deadlines:
+                    timeout = min(timeout, max(
+                        min(deadlines) - time.monotonic(), 0.))
+            ready = wait(conns + [self._wakeup_r], timeout=timeout)
+            with self._lock:
+                for conn in ready:
+                    if conn is self._wakeup_r:
+                        conn.recv()
+                    elif conn in self._workers:
+                        finished.append(self._receive(conn))
+                silent = time.monotonic() - 3 * self.heartbeat
+                for conn, state in list(self._workers.items()):
+                    if state['seen'] < silent:
+                        finished.append(self._lost(conn))
+                finished.extend(self._expire())
+            for future, result, error in filter(None, finished):
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+        with self._lock:
+            for conn in self._workers:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+                conn.close()
+            self._workers.clear()
+            for task in self._tasks.values():
+                if not task['future'].done():
+                    task['future'].set_exception(
+                        WorkerLost('coordinator closed without workers'))
+            self._tasks.clear()
+
+    def close(self):
+        """ Finish the submitted tasks, stop the workers and the
+        listener."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup_w.send(None)
+        self._thread.join()
+        # Unblock the accept call before closing the listener; the
+        # connection is dropped before any handshake
+        try:
+            Client(self.address).close()
+        except OSError:
+            pass
+        self._accept_thread.join()
+        self._listener.close()
+
+
+def main():
+    """ Command line entry of a worker node."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('address', help='coordinator HOST:PORT')
+    parser.add_argument('--authkey', default=os.environ.get(
+        'PYMEX_AUTHKEY', ''), help='shared secret of the coordinator')
+    parser.add_argument('--name', default=None, help='worker name')
+    args = parser.parse_args()
+    host, port = args.address.rsplit(':', 1)
+    run_worker((host, int(port)), args.authkey.encode(), args.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+""" Compact dtypes of the production frames. """
+import numpy as np
+from util.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+
+class DtypePolicy:
+
+    """ Shrink the production frames before keeping them in memory.
+
+    Float columns are stored as float32 when every value survives the
+    round trip within the tolerance, integer columns use the smallest
+    integer type holding their range, and label columns become
+    categoricals. The bytes before and after of every frame are
+    accumulated so the saving can be reported.
+    """
+
+    def __init__(self, rtol=1e-6, atol=0., max_unique=0.5):
+        """
+
+        Parameters
+        ----------
+        rtol: float
+            Relative tolerance of the float32 round trip.
+        atol: float
+            Absolute tolerance of the float32 round trip.
+        max_unique: float
+            Label columns with at most this fraction of distinct
+            values become categoricals.
+
+        """
+        self.rtol = rtol
+        self.atol = atol
+        self.max_unique = max_unique
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.columns = {}
+
+    def _float(self, values):
+        """ Float32 copy of the values, or the values when the
+        precision loss exceeds the tolerance."""
+        array = values.to_numpy()
+        finite = np.isfinite(array)
+        if np.abs(array[finite]).max(initial=0.) > \
+                np.finfo(np.float32).max:
+            return values
+        single = array.astype(np.float32)
+        if not np.allclose(single[finite], array[finite], rtol=self.rtol,
+                           atol=self.atol):
+            return values
+        return pd.Series(single, index=values.index, name=values.name)
+
+    def _label(self, values):
+        """ Categorical copy of a label column with few values."""
+        if len(values) and \
+                values.nunique() > self.max_unique * len(values):
+            return values
+        return values.astype('category')
+
+    def column(self, values):
+        """ Compact copy of a column."""
+        if pd.api.types.is_float_dtype(values) and \
+                values.dtype != np.float32:
+            return self._float(values)
+        if pd.api.types.is_integer_dtype(values):
+            return pd.to_numeric(values, downcast='integer')
+        if pd.api.types.is_object_dtype(values) or \
+                pd.api.types.is_string_dtype(values):
+            return self._label(values)
+        return values
+
+    def apply(self, frame):
+        """ Compact copy of a frame."""
+        compact = pd.DataFrame({column: self.column(frame[column])
+                                for column in frame}, index=frame.index)
+        self.bytes_before += int(frame.memory_usage(deep=True).sum())
+        self.bytes_after += int(compact.memory_usage(deep=True).sum())
+        for column in frame:
+            self.columns[column] = (frame[column].dtype,
+                                    compact[column].dtype)
+        return compact
+
+    __call__ = apply
+
+    @property
+    def saved(self):
+        """ Bytes saved over all the frames compacted."""
+        return self.bytes_before - self.bytes_after
+
+    def report(self):
+        """ Summary of the memory saved."""
+        if not self.bytes_before:
+            return 'No frame compacted'
+        return (f"{self.bytes_before / 2**20:.1f} MiB -> "
+                f"{self.bytes_after / 2**20:.1f} MiB, saved "
+                f"{self.saved / 2**20:.1f} MiB "
+                f"({100 * self.saved / self.bytes_before:.0f}%)")
@@ -0,0 +1,171 @@
+""" Streaming statistics of large sets of realizations. """
+import numpy as np
+from util.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+
+class EnsembleStats:
+
+    """ Approximate quantiles, mean and range of an ensemble, per cell.
+
+    A cell is a time step of a production series, or a model of an
+    npv table. Realizations are added in chunks of rows and only the
+    summary is kept, so the memory does not grow with the ensemble.
+
+    The first realizations, up to warmup, are kept and their exact
+    quantiles fix the bins of every cell, narrower in probability in
+    the tails. Every realization is then counted in the bins of its
+    cells, with two more bins for the realizations below and above
+    the warmup range, open down to the minimum and up to the maximum,
+    and a quantile is interpolated inside the bin where the cumulative
+    count crosses it. Below warmup realizations the quantiles are
+    exact.
+    """
+
+    def __init__(self, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9), index=None,
+                 bins=200, warmup=200):
+        """
+
+        Parameters
+        ----------
+        quantiles: tuple
+            Default probabilities of the summaries, in (0, 1).
+        index: array_like
+            Label of each cell, e.g. the time steps, used by frame.
+        bins: int
+            Number of bins of each cell inside the warmup range.
+        warmup: int
+            Number of realizations fixing the bins.
+
+        """
+        self.quantiles = tuple(quantiles)
+        self.index = index
+        self.bins = bins
+        self.warmup = warmup
+        self.count = 0
+        self._buffer = []
+        self._edges = None
+        self._keys = None
+        self._counts = None
+        self._sum = None
+        self.minimum = None
+        self.maximum = None
+
+    def _start(self):
+        """ Fix the bins from the buffered realizations."""
+        sample = np.concatenate(self._buffer)
+        # The extreme edges are the warmup minimum and maximum, so only
+        # the realizations beyond them fall in the two open bins. The
+        # bins are narrower in the tails, where the density bends most
+        probs = 0.5 - 0.5 * np.cos(np.linspace(0., np.pi, self.bins + 1))
+        self._edges = np.quantile(sample, probs, axis=0)
+        nb_cells = sample.shape[1]
+        self._low = self._edges[0]
+        span = self._edges[-1] - self._low
+        self._span = np.where(span > 0, span, 1.)
+        self._keys = self._key(self._edges).ravel(order='F')
+        self._counts = np.zeros((self.bins + 2) * nb_cells,
+                                dtype=np.int64)
+        self._buffer = []
+        self._count(sample)
+
+    def _key(self, values):
+        """ Sort key of values: the cell number plus the position of
+        the value between the inner edges of the cell, mapped to
+        [0.25, 0.75]. Values outside the inner edges keep a key below
+        the first one or above the last one, inside the cell."""
+        position = np.clip((values - self._low) / self._span, -0.4, 1.4)
+        return np.arange(values.shape[1]) + 0.25 + 0.5 * position
+
+    def _count(self, realizations):
+        """ Add realizations to the bin counts."""
+        nb_cells = realizations.shape[1]
+        cells = np.arange(nb_cells)
+        keys = self._key(realizations)
+        # Inner edges of the cell below the value, i.e. the bin
+        bins = np.searchsorted(self._keys, keys) - cells * (self.bins + 1)
+        self._counts += np.bincount((cells * (self.bins + 2) + bins).ravel(),
+                                    minlength=len(self._counts))
+
+    def update(self, realizations):
+        """ Add realizations, one per row, or a single one."""
+        realizations = np.asarray(realizations, dtype=float)
+        if realizations.ndim == 1:
+            realizations = realizations[None]
+        if self._sum is None:
+            self._sum = np.zeros(realizations.shape[1])
+            self.minimum = np.full(realizations.shape[1], np.inf)
+            self.maximum = np.full(realizations.shape[1], -np.inf)
+        self._sum += realizations.sum(axis=0)
+        np.minimum(self.minimum, realizations.min(axis=0), out=self.minimum)
+        np.maximum(self.maximum, realizations.max(axis=0), out=self.maximum)
+        self.count += len(realizations)
+        if self._edges is not None:
+            self._count(realizations)
+            return self
+        self._buffer.append(realizations.copy())
+        if self.count >= self.warmup:
+            self._start()
+        return self
+
+    @property
+    def mean(self):
+        """ Mean of each cell."""
+        return self._sum / self.count
+
+    def quantile(self, prob):
+        """ Estimate of the quantile for each cell."""
+        if self._edges is None:
+            return np.quantile(np.concatenate(self._buffer), prob, axis=0)
+        counts = self._counts.reshape(-1, self.bins + 2).T
+        edges = np.vstack([self.minimum, self._edges, self.maximum])
+        cumulative = np.cumsum(counts, axis=0)
+        target = prob * self.count
+        cells = np.arange(counts.shape[1])
+        crossing = np.minimum(np.sum(cumulative < target, axis=0),
+                              self.bins + 1)
+        before = np.where(crossing > 0,
+                          cumulative[crossing - 1, cells], 0)
+        inside = counts[crossing, cells]
+        fraction = np.where(inside > 0, (target - before)
+                            / np.where(inside > 0, inside, 1), 0.)
+        low = edges[crossing, cells]
+        high = edges[crossing + 1, cells]
+        return low + np.clip(fraction, 0., 1.) * (high - low)
+
+    def frame(self):
+        """ Mean, quantiles and range of each cell as a DataFrame,
+        indexed by the cell labels."""
+        data = {'mean': self.mean}
+        for prob in self.quantiles:
+            data[f"p{100 * prob:g}"] = self.quantile(prob)
+        data['min'] = self.minimum
+        data['max'] = self.maximum
+        return pd.DataFrame(data, index=self.index)
+
+    @classmethod
+    def from_npy(cls, path, chunk_size=256, scale=1., **kwargs):
+        """ Statistics of the columns of a (realizations, cells) .npy
+        array, read memory mapped chunk_size rows at a time."""
+        array = np.load(path, mmap_mode='r')
+        stats = cls(**kwargs)
+        for start in range(0, len(array), chunk_size):
+            stats.update(scale * np.asarray(array[start:start + chunk_size],
+                                            dtype=float))
+        return stats
+
+    @classmethod
+    def from_store(cls, store, case, model, column, time_column='time',
+                   **kwargs):
+        """ Statistics over time of a column of every run of a model
+        in a ResultsStore, one run in memory at a time."""
+        stats = cls(**kwargs)
+        for key in store.entries(case, model):
+            run = key.split('/', 2)[2]
+            frame = store.read(case, model, run,
+                               columns=[time_column, column])
+            if stats.index is None:
+                stats.index = frame[time_column].to_numpy()
+            stats.update(frame[column].to_numpy())
+        return stats
@@ -0,0 +1,277 @@
+""" Long-lived pool of simulation workers. """
+import os
+import time
+import pickle
+import signal
+import threading
+import collections
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from concurrent.futures import Future, as_completed
+
+
+class WorkerLost(RuntimeError):
+
+    """ The worker process died while running a task."""
+
+
+class TaskTimeout(TimeoutError):
+
+    """ The task exceeded its wall-clock time limit."""
+
+
+class TaskCancelled(RuntimeError):
+
+    """ The task was cancelled while it was running."""
+
+
+def _worker(conn, function, config, initializer=None, slot=0):
+    """ Worker loop: run tasks until the stop sentinel arrives.
+
+    The configuration is received once, when the process starts,
+    and every task only carries its own arguments. The worker leads
+    its own process group, so a timed out task is killed together
+    with the simulator processes it started.
+    """
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    if initializer is not None:
+        initializer(slot)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        task_id, args = task
+        try:
+            result = ('done', task_id, function(config, *args))
+        except Exception as exc:
+            result = ('error', task_id, exc)
+        try:
+            conn.send(result)
+        except (pickle.PicklingError, TypeError, AttributeError) as exc:
+            conn.send(('error', task_id, RuntimeError(repr(exc))))
+    conn.close()
+
+
+class Evaluator:
+
+    """ Persistent worker processes with a futures based API."""
+
+    def __init__(self, function, config, pool_size=None, initializer=None):
+        """
+
+        Parameters
+        ----------
+        function: callable
+            Module level function called as function(config, *args)
+            inside the workers.
+        config: object
+            Configuration shipped once to each worker.
+        pool_size: int
+            Number of worker processes. Defaults to the cpu count.
+        initializer: callable
+            Called as initializer(slot) when a worker starts, where
+            slot in range(pool_size) is kept by its replacements.
+
+        """
+        self.function = function
+        self.config = config
+        self.pool_size = pool_size or os.cpu_count()
+        self.initializer = initializer
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._tasks = {}
+        self._workers = {}
+        self._next_id = 0
+        self._closed = False
+        self._wakeup_r, self._wakeup_w = mp.Pipe(duplex=False)
+        for slot in range(self.pool_size):
+            self._spawn(slot)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _spawn(self, slot):
+        """ Start one worker process."""
+        conn, child_conn = mp.Pipe()
+        proc = mp.Process(target=_worker,
+                          args=(child_conn, self.function, self.config,
+                                self.initializer, slot),
+                          daemon=True)
+        proc.start()
+        child_conn.close()
+        self._workers[conn] = {'proc': proc, 'task': None,
+                               'deadline': None, 'cancelled': False,
+                               'slot': slot}
+
+    def _wakeup(self):
+        """ Interrupt the dispatcher wait."""
+        self._wakeup_w.send(None)
+
+    def submit(self, *args, timeout=None):
+        """ Schedule function(config, *args) and return a Future.
+
+        A task running longer than timeout seconds is killed and its
+        Future fails with TaskTimeout.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('cannot submit to a closed evaluator')
+            task_id = self._next_id
+            self._next_id += 1
+            self._tasks[task_id] = (future, args, timeout)
+            self._pending.append(task_id)
+            self._wakeup()
+        return future
+
+    def cancel(self, future):
+        """ Cancel a task: a queued task is dropped and the worker of a
+        running one is killed, its Future failing with TaskCancelled.
+        Return False when the task already finished."""
+        if future.cancel():
+            return True
+        with self._lock:
+            for state in self._workers.values():
+                task_id = state['task']
+                if task_id is not None and \
+                        self._tasks[task_id][0] is future:
+                    # Expire the task now: the dispatcher kills it
+                    state.update(deadline=time.monotonic(), cancelled=True)
+                    self._wakeup()
+                    return True
+        return False
+
+    def map_unordered(self, iterable):
+        """ Submit every item and yield (index, result) pairs in
+        completion order."""
+        futures = {self.submit(item): index
+                   for index, item in enumerate(iterable)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def _dispatch(self):
+        """ Send pending tasks to idle workers."""
+        idle = [conn for conn, state in self._workers.items()
+                if state['task'] is None]
+        while idle and self._pending:
+            task_id = self._pending.popleft()
+            future, args, timeout = self._tasks[task_id]
+            if not future.set_running_or_notify_cancel():
+                del self._tasks[task_id]
+                continue
+            conn = idle.pop()
+            state = self._workers[conn]
+            state['task'] = task_id
+            if timeout is not None:
+                state['deadline'] = time.monotonic() + timeout
+            conn.send((task_id, args))
+
+    def _finish(self, conn, status, task_id, value):
+        """ Free the worker and return the finished future."""
+        self._workers[conn].update(task=None, deadline=None,
+                                   cancelled=False)
+        future, _, _ = self._tasks.pop(task_id)
+        if status == 'done':
+            return future, value, None
+        return future, None, value
+
+    def _lost(self, conn, error=None):
+        """ Replace a dead worker and return its failed future."""
+        state = self._workers.pop(conn)
+        proc = state['proc']
+        conn.close()
+        proc.join()
+        if not self._closed:
+            self._spawn(state['slot'])
+        if state['task'] is None:
+            return None
+        future, _, _ = self._tasks.pop(state['task'])
+        if error is None:
+            error = WorkerLost(f"worker exited with code {proc.exitcode}")
+        return future, None, error
+
+    def _kill(self, conn):
+        """ Kill a worker whose task timed out or was cancelled."""
+        state = self._workers[conn]
+        proc = state['proc']
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            proc.kill()
+        if state['cancelled']:
+            return self._lost(conn, TaskCancelled(
+                f"task cancelled on worker {proc.pid}"))
+        return self._lost(conn, TaskTimeout(
+            f"task exceeded its time limit on worker {proc.pid}"))
+
+    def _next_deadline(self):
+        """ Seconds until the earliest task deadline, or None."""
+        deadlines = [state['deadline'] for state in self._workers.values()
+                     if state['deadline'] is not None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0.)
+
+    def _loop(self):
+        """ Dispatcher thread."""
+        while True:
+            with self._lock:
+                # Dispatch first: it drops the cancelled queued tasks
+                self._dispatch()
+                if self._closed and not self._tasks:
+                    break
+                conns = list(self._workers)
+                timeout = self._next_deadline()
+            finished = []
+            for conn in wait(conns + [self._wakeup_r], timeout):
+                with self._lock:
+                    if conn is self._wakeup_r:
+                        conn.recv()
+                        continue
+                    try:
+                        status, task_id, value = conn.recv()
+                    except (EOFError, OSError):
+                        finished.append(self._lost(conn))
+                        continue
+                    finished.append(self._finish(conn, status, task_id,
+                                                 value))
+            with self._lock:
+                now = time.monotonic()
+                for conn, state in list(self._workers.items()):
+                    if state['deadline'] is not None and \
+                            state['deadline'] <= now:
+                        finished.append(self._kill(conn))
+            # Resolve outside the lock: callbacks may submit new tasks
+            for future, result, error in filter(None, finished):
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+        for conn, state in self._workers.items():
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            state['proc'].join()
+            conn.close()
+        self._workers.clear()
+
+    def close(self):
+        """ Finish the submitted tasks and stop the workers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup()
+        self._thread.join()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
@@ -0,0 +1,212 @@
+""" Batch export of the figures listed in a manifest. """
+import os
+import time
+import concurrent.futures
+import yaml
+from util.lazy import headless
+from util.rendercache import RenderCache
+
+_DATASETS = {}
+
+
+def load_manifest(path):
+    """ Read a yaml manifest.
+
+    The manifest holds the datasets shared by the figures and the
+    figure jobs::
+
+        datasets:
+          egg:
+            case: egg
+            columns: [time, cum_op]
+            models:
+              HF: ./results/egg/layers/Egg_orig_wells.pkl
+              W1: ./results/egg/wav/unif/Egg_wav_1_wells.pkl
+          spe10_opt:
+            kind: optlog
+            opt: ./results/spe10/results_spe_wav.csv
+            hf: ./results/spe10/results_spe_ori.csv
+        figures:
+          - dataset: egg
+            method: plot_cum_oil_prod_zoom
+            output: figures/egg_cum_oil_models.eps
+          - dataset: spe10_opt
+            method: opt_history_ori
+            output: figures/tr_upd_spe10.eps
+
+    """
+    with open(path) as file:
+        manifest = yaml.load(file, Loader=yaml.FullLoader)
+    for job in manifest['figures']:
+        if job['dataset'] not in manifest['datasets']:
+            raise KeyError(f"figure {job['output']} uses the unknown "
+                           f"dataset {job['dataset']}")
+    return manifest
+
+
+def load_dataset(spec, store_root='./results/store'):
+    """ Data of a dataset entry of the manifest: a ModelCollection of
+    production frames, or the logs of an optimization."""
+    if spec.get('kind', 'models') == 'optlog':
+        from util.optlog import read_log
+        mult_df, vectors = read_log(spec['opt'])
+        hf_df = read_log(spec['hf'])[0] if spec.get('hf') else None
+        return mult_df, hf_df, vectors
+    from util.store import ResultsStore
+    from util.models import ModelCollection
+    from util.dtypes import DtypePolicy
+    store = ResultsStore(store_root)
+    models = ModelCollection(policy=DtypePolicy())
+    for name, path in spec['models'].items():
+        models.add(name, store.from_pickle(
+            path, spec.get('case', 'default'), name,
+            columns=spec.get('columns')))
+    return models
+
+
+def _initializer(datasets):
+    """ Worker set up: headless backend and the shared datasets."""
+    headless('Agg')
+    _DATASETS.update(datasets)
+
+
+def render(job):
+    """ Draw one figure job and return its render time in seconds."""
+    # Imported after the backend is chosen
+    import matplotlib.pyplot as plt
+    start = time.perf_counter()
+    folder = os.path.dirname(job['output'])
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    data = _DATASETS[job['dataset']]
+    if isinstance(data, tuple):
+        from util.plot_opt import PlotOpt
+        mult_df, hf_df, vectors = data
+        plot = PlotOpt(mult_df, hf_df, vectors=vectors,
+                       output=job['output'], **job.get('options', {}))
+    else:
+        from util.plot import PlotPymex
+        plot = PlotPymex(data, output=job['output'],
+                         **job.get('options', {}))
+    try:
+        getattr(plot, job['method'])(**job.get('args', {}))
+    finally:
+        plt.close('all')
+    return time.perf_counter() - start
+
+
+class FigureBatch:
+
+    """ Render the figures of a manifest in parallel.
+
+    Every dataset is loaded once, in the parent process, and handed
+    to the workers when they start. The workers draw with the Agg
+    backend, so no display is needed. Figures whose data, plotting
+    code and parameters did not change since their last render are
+    kept, and their datasets are not even loaded.
+    """
+
+    def __init__(self, manifest, pool_size=None,
+                 store_root='./results/store',
+                 cache_path='.render_cache.json', use_cache=True):
+        """
+
+        Parameters
+        ----------
+        manifest: str or dict
+            Path of the yaml manifest, or the manifest itself.
+        pool_size: int
+            Number of worker processes. Defaults to the number of
+            cpus, at most the number of figures.
+        store_root: str
+            Results store the production frames are read through.
+        cache_path: str
+            Json file of the render cache.
+        use_cache: bool
+            Reuse the up to date figures. Every figure is drawn
+            again when False, and the cache is refreshed.
+
+        """
+        if isinstance(manifest, str):
+            manifest = load_manifest(manifest)
+        self.manifest = manifest
+        self.pool_size = pool_size
+        self.store_root = store_root
+        self.cache = RenderCache(cache_path)
+        self.use_cache = use_cache
+        self.load_times = {}
+        self.timings = []
+
+    def load(self, jobs=None):
+        """ Load the datasets used by at least one of the jobs, all
+        the figures by default."""
+        if jobs is None:
+            jobs = self.manifest['figures']
+        used = {job['dataset'] for job in jobs}
+        datasets = {}
+        for name in sorted(used):
+            start = time.perf_counter()
+            datasets[name] = load_dataset(self.manifest['datasets'][name],
+                                          self.store_root)
+            self.load_times[name] = time.perf_counter() - start
+        return datasets
+
+    def run(self):
+        """ Render every figure.
+
+        Returns
+        -------
+        list
+            One dict per figure with its output, method, render time
+            in seconds, error message and whether the cached file was
+            kept, in manifest order.
+
+        """
+        jobs = self.manifest['figures']
+        fingerprints = [self.cache.fingerprint(
+            job, self.manifest['datasets'][job['dataset']])
+            for job in jobs]
+        cached = [self.use_cache and self.cache.lookup(job, fingerprint)
+                  for job, fingerprint in zip(jobs, fingerprints)]
+        stale = [job for job, hit in zip(jobs, cached) if not hit]
+        futures = {}
+        if stale:
+            datasets = self.load(stale)
+            pool_size = min(self.pool_size or os.cpu_count() or 1,
+                            len(stale))
+            pool = concurrent.futures.ProcessPoolExecutor(
+                pool_size, initializer=_initializer, initargs=(datasets,))
+            futures = {id(job): pool.submit(render, job) for job in stale}
+        self.timings = []
+        for job, fingerprint, hit in zip(jobs, fingerprints, cached):
+            record = {'output': job['output'], 'method': job['method'],
+                      'seconds': None, 'error': None, 'cached': hit}
+            if not hit:
+                try:
+                    record['seconds'] = futures[id(job)].result()
+                    self.cache.put(job, fingerprint)
+                except Exception as exc:
+                    record['error'] = f"{type(exc).__name__}: {exc}"
+            self.timings.append(record)
+        if stale:
+            pool.shutdown()
+        self.cache.save()
+        return self.timings
+
+    def report(self):
+        """ Table of the load and render times."""
+        lines = [f"{'load ' + name:<50} {seconds:8.2f} s"
+                 for name, seconds in self.load_times.items()]
+        for record in self.timings:
+            if record['cached']:
+                lines.append(f"{record['output']:<50} {'cached':>10}")
+            elif record['error'] is None:
+                lines.append(f"{record['output']:<50} "
+                             f"{record['seconds']:8.2f} s")
+            else:
+                lines.append(f"{record['output']:<50} failed: "
+                             f"{record['error']}")
+        stats = self.cache.stats()
+        lines.append(f"render cache: {stats['hits']} hits, "
+                     f"{stats['misses']} misses")
+        return '\n'.join(lines)
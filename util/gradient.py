@@ -0,0 +1,90 @@
+""" Finite difference and stochastic gradient stencils. """
+import numpy as np
+from util.controls import unique_controls
+
+
+def _forward(control, step):
+    """ One point per variable, stepping backward at the upper bound."""
+    size = len(control)
+    steps = np.where(control + step <= 1., step, -step)
+    points = np.vstack((control, control + np.diag(steps)))
+    weights = np.zeros((size, size + 1))
+    weights[:, 0] = -1. / steps
+    weights[np.arange(size), np.arange(1, size + 1)] = 1. / steps
+    return points, weights
+
+
+def _central(control, step):
+    """ Two points per variable, one-sided against the bounds."""
+    size = len(control)
+    upper = np.minimum(control + step, 1.)
+    lower = np.maximum(control - step, 0.)
+    eye = np.eye(size, dtype=bool)
+    plus = np.where(eye, upper, control)
+    minus = np.where(eye, lower, control)
+    weights = np.zeros((size, 2 * size))
+    spread = upper - lower
+    weights[np.arange(size), np.arange(size)] = 1. / spread
+    weights[np.arange(size), size + np.arange(size)] = -1. / spread
+    return np.vstack((plus, minus)), weights
+
+
+def _spsa(control, step, nb_samples, rng):
+    """ Simultaneous perturbation along random sign directions."""
+    size = len(control)
+    points = []
+    weights = np.zeros((size, 2 * nb_samples))
+    for sample in range(nb_samples):
+        delta = rng.choice([-1., 1.], size)
+        plus = np.clip(control + step * delta, 0., 1.)
+        minus = np.clip(control - step * delta, 0., 1.)
+        spread = plus - minus
+        valid = spread != 0
+        weights[valid, 2 * sample] = 1. / spread[valid] / nb_samples
+        weights[valid, 2 * sample + 1] = -1. / spread[valid] / nb_samples
+        points.extend((plus, minus))
+    return np.array(points), weights
+
+
+def stencil(control, method='forward', step=1e-2, nb_samples=1,
+            seed=None):
+    """ Perturbation points of a gradient estimate.
+
+    The points stay inside the normalized bounds [0, 1] and repeated
+    points are merged, so the gradient is ``weights @ npv(points)``.
+
+    Parameters
+    ----------
+    control: array_like
+        Normalized control vector.
+    method: str
+        'forward', 'central' or 'spsa'.
+    step: float
+        Perturbation size in normalized units.
+    nb_samples: int
+        Number of random directions of the 'spsa' method.
+    seed: int
+        Seed of the 'spsa' directions.
+
+    Returns
+    -------
+    points: numpy.ndarray
+        Unique perturbation points, one per row.
+    weights: numpy.ndarray
+        Array (len(control), len(points)).
+
+    """
+    control = np.clip(np.asarray(control, dtype=float), 0., 1.)
+    if method == 'forward':
+        points, weights = _forward(control, step)
+    elif method == 'central':
+        points, weights = _central(control, step)
+    elif method == 'spsa':
+        rng = np.random.default_rng(seed)
+        points, weights = _spsa(control, step, nb_samples, rng)
+    else:
+        raise ValueError(f"unknown gradient method '{method}'")
+    points, inverse = unique_controls(points)
+    merged = np.zeros((len(control), len(points)))
+    np.add.at(merged.T, inverse, weights.T)
+    return points, merged
@@ -0,0 +1,83 @@
+""" Import time of the plotting modules, as a regression guard.
+
+Each module is imported in a fresh interpreter with ``-X importtime``.
+The check fails when an import takes longer than the budget or loads
+one of the modules that must stay deferred::
+
+    python -m util.importtime util.plot util.plot_opt --max-ms 300
+
+"""
+import sys
+import argparse
+import subprocess
+
+# Modules the plotting modules must not load at import time
+DEFERRED = ('pandas', 'seaborn', 'matplotlib', 'yaml', 'util.simulate',
+            'multiprocessing', 'PyMEX')
+
+
+def measure(module, repeat=3):
+    """ Import time of a module in a fresh interpreter.
+
+    Returns
+    -------
+    seconds: float
+        Best cumulative import time over the repeats.
+    loaded: set
+        Names of the modules imported along with it.
+
+    """
+    best = None
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+            capture_output=True, text=True, check=True).stderr
+        cumulative = None
+        for line in output.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, total, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            loaded.add(name)
+            if name == module:
+                cumulative = int(total) * 1e-6
+        if cumulative is not None and (best is None or cumulative < best):
+            best = cumulative
+    return best, loaded
+
+
+def check(modules, max_ms=None, deferred=DEFERRED, repeat=3):
+    """ Measure the modules and return the failed checks."""
+    failures = []
+    for module in modules:
+        seconds, loaded = measure(module, repeat)
+        eager = sorted(name for name in deferred if name in loaded)
+        print(f"{module:<20} {1e3 * seconds:8.1f} ms")
+        if max_ms is not None and 1e3 * seconds > max_ms:
+            failures.append(f"{module} imports in {1e3 * seconds:.1f} ms,"
+                            f" over the {max_ms} ms budget")
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)}")
+    return failures
+
+
+def main():
+    """ Command line entry."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*',
+                        default=['util.plot', 'util.plot_opt',
+                                 'util.monitor', 'util.store',
+                                 'util.dtypes', 'spe10_opt'])
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='import time budget of each module')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    failures = check(args.modules, args.max_ms, repeat=args.repeat)
+    for failure in failures:
+        print(failure)
+    sys.exit(bool(failures))
+
+
+if __name__ == '__main__':
+    main()
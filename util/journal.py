@@ -0,0 +1,71 @@
+""" Append-only journal of batch results. """
+import os
+import json
+
+
+class Journal:
+
+    """ Results of a batch appended to a file as they complete.
+
+    Each line holds the cache key of a control and its net present
+    value, so a rerun of the same batch skips the finished controls.
+    A line cut by a crash is ignored.
+    """
+
+    def __init__(self, path):
+        """
+
+        Parameters
+        ----------
+        path: str
+            Journal file, created when missing.
+
+        """
+        self.path = path
+        self.entries = self.load()
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if self._file.tell() and not self._ends_with_newline():
+            # End the line cut by a crash, so the next entry is kept
+            self._file.write('\n')
+            self._file.flush()
+        return self
+
+    def _ends_with_newline(self):
+        """ Whether the journal file ends with a complete line."""
+        with open(self.path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b'\n'
+
+    def __exit__(self, *exc):
+        self._file.close()
+        self._file = None
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        """ Read the finished entries."""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry['key']] = entry['npv']
+        return entries
+
+    def append(self, key, npv):
+        """ Record a finished control and flush it to disk."""
+        self.entries[key] = npv
+        self._file.write(json.dumps({'key': key, 'npv': float(npv)}) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
@@ -0,0 +1,74 @@
+""" Deferred imports of the heavy plotting stack. """
+import os
+import sys
+import importlib
+
+# Set to 1 to draw with a non-interactive backend
+HEADLESS_VARIABLE = 'PYMEX_HEADLESS'
+
+_BACKEND = {'name': None}
+
+
+class LazyModule:
+
+    """ Module imported the first time one of its attributes is used.
+
+    Stands for ``import name as alias`` at the top of a module, so the
+    import cost is only paid by the code paths that need it.
+    """
+
+    def __init__(self, name, before=None):
+        """
+
+        Parameters
+        ----------
+        name: str
+            Full name of the module.
+        before: callable
+            Called once right before the module is imported.
+
+        """
+        self._name = name
+        self._before = before
+        self._module = None
+
+    def _load(self):
+        """ Import the module."""
+        if self._module is None:
+            if self._before is not None and self._name not in sys.modules:
+                self._before()
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def headless(backend='Agg'):
+    """ Draw with a non-interactive backend.
+
+    Must be called before pyplot is first used; it can also be
+    requested with the PYMEX_HEADLESS environment variable.
+    """
+    _BACKEND['name'] = backend
+    if 'matplotlib.pyplot' in sys.modules:
+        import matplotlib
+        matplotlib.use(backend, force=True)
+
+
+def _select_backend():
+    """ Apply the headless backend before pyplot is imported."""
+    backend = _BACKEND['name']
+    if backend is None and os.environ.get(HEADLESS_VARIABLE, '') not in \
+            ('', '0'):
+        backend = 'Agg'
+    if backend is not None:
+        import matplotlib
+        matplotlib.use(backend)
+
+
+pyplot = LazyModule('matplotlib.pyplot', before=_select_backend)
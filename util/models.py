@@ -0,0 +1,89 @@
+""" Collection of the production frames of several models. """
+import numpy as np
+from util.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+
+class ModelCollection:
+
+    """ Production frames of several models, kept without copies.
+
+    Replaces ``pd.concat([frame.assign(Models=name), ...])``: each
+    model keeps its own frame, and the long-form frame the plots need
+    is built only with the requested columns and a categorical label
+    column.
+    """
+
+    def __init__(self, models=None, label='Models', policy=None):
+        """
+
+        Parameters
+        ----------
+        models: dict
+            Model name -> production frame, in plotting order.
+        label: str
+            Name of the model label column of the long-form frames.
+        policy: DtypePolicy
+            Compacts the frames as they are added. Frames are kept
+            as given when missing.
+
+        """
+        self.label = label
+        self.policy = policy
+        self.frames = {}
+        self._view = None
+        for name, frame in (models or {}).items():
+            self.add(name, frame)
+
+    def add(self, name, frame):
+        """ Add the frame of a model, without copying it unless it is
+        compacted."""
+        if self.policy is not None:
+            frame = self.policy.apply(frame)
+        self.frames[name] = frame
+        self._view = None
+
+    def __getitem__(self, name):
+        return self.frames[name]
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def names(self):
+        """ Model names in plotting order."""
+        return list(self.frames)
+
+    @property
+    def columns(self):
+        """ Columns present in every model."""
+        columns = None
+        for frame in self.frames.values():
+            names = [column for column in frame
+                     if columns is None or column in columns]
+            columns = names
+        return columns or []
+
+    def labels(self):
+        """ Categorical model label of each row of the long form."""
+        lengths = [len(frame) for frame in self.frames.values()]
+        codes = np.repeat(np.arange(len(lengths), dtype=np.int16), lengths)
+        return pd.Categorical.from_codes(codes, self.names)
+
+    def frame(self, columns=None):
+        """ Long-form frame of the requested columns and the model
+        label. The last frame built is kept for the next call."""
+        columns = tuple(self.columns if columns is None else columns)
+        if self._view is not None and self._view[0] == columns:
+            return self._view[1]
+        data = {column: np.concatenate([frame[column].to_numpy()
+                                        for frame in self.frames.values()])
+                for column in columns if column != self.label}
+        data[self.label] = self.labels()
+        view = pd.DataFrame(data)
+        self._view = (columns, view)
+        return view
@@ -0,0 +1,180 @@
+""" Live monitoring of a running optimization log. """
+import io
+import os
+import numpy as np
+from util.lazy import LazyModule, pyplot as plt
+
+pd = LazyModule('pandas')
+
+
+class LogTail:
+
+    """ Follow a growing tab separated log from a byte offset.
+
+    Each read parses only the complete lines appended since the
+    previous one. A log truncated or replaced by a shorter file is
+    read again from the start.
+    """
+
+    def __init__(self, path, sep='\t'):
+        self.path = path
+        self.sep = sep
+        self.offset = 0
+        self.header = None
+        self._partial = b''
+
+    def read(self):
+        """ Return the new rows as a DataFrame, possibly empty."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return pd.DataFrame(columns=self.header)
+        if size < self.offset:
+            self.offset = 0
+            self.header = None
+            self._partial = b''
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            data = file.read()
+        self.offset += len(data)
+        lines = (self._partial + data).split(b'\n')
+        # Keep the last line until its newline is written
+        self._partial = lines.pop()
+        if self.header is None and lines:
+            self.header = lines.pop(0).decode().split(self.sep)
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return pd.DataFrame(columns=self.header)
+        return pd.read_csv(io.BytesIO(b'\n'.join(lines)), sep=self.sep,
+                           names=self.header, header=None)
+
+
+class _Series:
+
+    """ Growing x, y buffers drawn by one line."""
+
+    def __init__(self, line):
+        self.line = line
+        self.size = 0
+        self.x_data = np.empty(64)
+        self.y_data = np.empty(64)
+
+    def extend(self, x_new, y_new):
+        """ Append points, doubling the buffers when full."""
+        size = self.size + len(x_new)
+        if size > len(self.x_data):
+            capacity = max(size, 2 * len(self.x_data))
+            self.x_data = np.resize(self.x_data, capacity)
+            self.y_data = np.resize(self.y_data, capacity)
+        self.x_data[self.size:size] = x_new
+        self.y_data[self.size:size] = y_new
+        self.size = size
+        self.line.set_data(self.x_data[:size], self.y_data[:size])
+
+
+class LiveMonitor:
+
+    """ Plot the NPV history and the cost of a running optimization.
+
+    The top axes show -fob_c per optimization level, the bottom axes
+    the time spent and the number of high fidelity evaluations. New
+    rows only update the lines they touch; the figure is fully redrawn
+    only when the data leave the current axis limits.
+    """
+
+    def __init__(self, path, refresh=5.):
+        """
+
+        Parameters
+        ----------
+        path: str
+            Tab separated optimization log being written.
+        refresh: float
+            Seconds between reads of the log.
+
+        """
+        self.tail = LogTail(path)
+        self.refresh = refresh
+        self.nb_rows = 0
+        self.fig, (self.ax_npv, self.ax_time) = plt.subplots(
+            2, 1, sharex=True)
+        self.ax_nfe = self.ax_time.twinx()
+        self.levels = {}
+        self.time = _Series(self.ax_time.plot([], [], 'k-')[0])
+        self.nfe = _Series(self.ax_nfe.plot([], [], 'b--')[0])
+        self.ax_npv.set_ylabel(r"NPV ($1 \times 10^{-6}$)")
+        self.ax_time.set_ylabel('Time (seconds)')
+        self.ax_nfe.set_ylabel('HF evaluations')
+        self.ax_time.set_xlabel('Iterations')
+        self.fig.set_size_inches(6, 4)
+        self._timer = None
+        self._stale = True
+
+    def _level(self, level):
+        """ Series of an optimization level."""
+        if level not in self.levels:
+            line, = self.ax_npv.plot([], [], marker='o', markersize=3,
+                                     label=f"Level {level}")
+            self.levels[level] = _Series(line)
+            self.ax_npv.legend(title='opt_level', fontsize='small')
+            self._stale = True
+        return self.levels[level]
+
+    def update(self):
+        """ Read the new rows and update the changed lines.
+
+        Returns
+        -------
+        list
+            Artists that received new data.
+
+        """
+        rows = self.tail.read()
+        if rows.empty:
+            return []
+        iterations = self.nb_rows + np.arange(len(rows))
+        self.nb_rows += len(rows)
+        changed = []
+        npv = -1 * rows['fob_c'].to_numpy(float)
+        levels = rows['opt_level'].to_numpy()
+        for level in pd.unique(levels):
+            mask = levels == level
+            series = self._level(level)
+            series.extend(iterations[mask], npv[mask])
+            changed.append(series.line)
+        self.time.extend(iterations, rows['time-spend'].to_numpy(float))
+        self.nfe.extend(iterations, rows['nfev-hf'].to_numpy(float))
+        changed.extend([self.time.line, self.nfe.line])
+        self._redraw(changed)
+        return changed
+
+    def _redraw(self, changed):
+        """ Draw the changed lines over the canvas, or the whole figure
+        when the limits must grow."""
+        axes = (self.ax_npv, self.ax_time, self.ax_nfe)
+        limits = [(ax.get_xlim(), ax.get_ylim()) for ax in axes]
+        for ax in axes:
+            ax.relim()
+            ax.autoscale_view()
+        canvas = self.fig.canvas
+        unchanged = limits == [(ax.get_xlim(), ax.get_ylim())
+                               for ax in axes]
+        if unchanged and not self._stale and canvas.supports_blit and \
+                getattr(canvas, 'renderer', None) is not None:
+            # The lines only grow, so drawing them again over the
+            # previous frame leaves the rest of the figure untouched
+            for artist in changed:
+                artist.axes.draw_artist(artist)
+            canvas.blit(self.fig.bbox)
+        else:
+            canvas.draw_idle()
+            self._stale = False
+
+    def run(self):
+        """ Refresh the figure until the window is closed."""
+        self.update()
+        self._timer = self.fig.canvas.new_timer(
+            interval=int(1000 * self.refresh))
+        self._timer.add_callback(self.update)
+        self._timer.start()
+        plt.show()
@@ -0,0 +1,120 @@
+""" Fast reader of the optimization logs. """
+import os
+import zipfile
+import numpy as np
+from util.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+
+# Columns holding control vectors written as '[a b c]' strings
+VECTOR_COLUMNS = ('x_c', 'x_s')
+
+
+def parse_vectors(column):
+    """ Parse a column of '[a b c]' strings in one pass.
+
+    Parameters
+    ----------
+    column: iterable of str
+        Vectors printed by numpy, all with the same width.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array (len(column), width) of floats.
+
+    """
+    rows = list(column)
+    if not rows:
+        return np.empty((0, 0))
+    text = ' '.join(rows).translate(str.maketrans('[]', '  '))
+    # Width of each row: the starts of its numbers in the joined text
+    chars = np.frombuffer(text.encode('ascii', 'replace'), dtype=np.uint8)
+    filled = chars > ord(' ')
+    starts = filled.copy()
+    starts[1:] &= ~filled[:-1]
+    offsets = np.zeros(len(rows), dtype=np.int64)
+    np.cumsum([len(row) + 1 for row in rows[:-1]], out=offsets[1:])
+    widths = np.add.reduceat(starts, offsets, dtype=np.int64)
+    if np.any(widths != widths[0]):
+        row = int(np.argmax(widths != widths[0]))
+        raise ValueError(f"vector {row} has {widths[row]} values, "
+                         f"the first one {widths[0]}")
+    values = np.array(text.split(), dtype=float)
+    return values.reshape(len(rows), -1)
+
+
+def _sidecar(path):
+    """ Binary cache file of the log."""
+    return path + '.npz'
+
+
+def _stamp(path):
+    """ Modification time and size of the log."""
+    stat = os.stat(path)
+    return np.array([stat.st_mtime_ns, stat.st_size])
+
+
+def _column_array(column):
+    """ Array of a column storable without pickling: numbers and
+    booleans as they are, anything else, e.g. strings, as text."""
+    if pd.api.types.is_numeric_dtype(column) or \
+            pd.api.types.is_bool_dtype(column):
+        return column.to_numpy()
+    return column.to_numpy(str)
+
+
+def _load_sidecar(sidecar, stamp):
+    """ Frame and vectors of an up to date sidecar, or None when it
+    is stale or cannot be read."""
+    try:
+        with np.load(sidecar) as data:
+            if not np.array_equal(data['__stamp__'], stamp):
+                return None
+            columns = list(data['__columns__'])
+            frame = pd.DataFrame({name: data['col_' + name]
+                                  for name in columns})
+            vectors = {name: data['vec_' + name]
+                       for name in data['__vectors__']}
+    except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+    return frame, vectors
+
+
+def read_log(path, sep='\t', vector_columns=VECTOR_COLUMNS, cache=True):
+    """ Read an optimization log and parse its control vectors.
+
+    The parsed log is cached in a binary sidecar next to the csv,
+    rebuilt whenever the csv modification time or size changes, or
+    when it cannot be read.
+
+    Returns
+    -------
+    frame: pandas.DataFrame
+        Scalar columns of the log.
+    vectors: dict
+        Column name -> array (rows, width) of the vector columns.
+
+    """
+    sidecar = _sidecar(path)
+    stamp = _stamp(path)
+    if cache and os.path.exists(sidecar):
+        cached = _load_sidecar(sidecar, stamp)
+        if cached is not None:
+            return cached
+    frame = pd.read_csv(path, sep=sep)
+    names = [name for name in vector_columns if name in frame]
+    vectors = {name: parse_vectors(frame[name]) for name in names}
+    frame = frame.drop(columns=names)
+    if cache:
+        arrays = {'col_' + name: _column_array(frame[name])
+                  for name in frame}
+        arrays.update({'vec_' + name: value
+                       for name, value in vectors.items()})
+        tmp_path = f"{sidecar}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, __stamp__=stamp,
+                 __columns__=np.array(frame.columns, dtype=str),
+                 __vectors__=np.array(names, dtype=str), **arrays)
+        os.replace(tmp_path, sidecar)
+    return frame, vectors
@@ -0,0 +1,66 @@
+""" Placement of the simulator processes on the cpu cores. """
+import os
+
+
+# Thread count variables honoured by the solver libraries
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS',
+                    'OPENBLAS_NUM_THREADS')
+
+
+def available_cpus():
+    """ Cpus this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+class Placement:
+
+    """ Pin each worker to a disjoint cpu set and cap its threads.
+
+    Each simulation uses threads_per_run cores, so the pool holds as
+    many workers as disjoint sets fit in the available cpus and no
+    core is oversubscribed.
+    """
+
+    def __init__(self, threads_per_run=1, cpus=None, pin=True, env=None):
+        """
+
+        Parameters
+        ----------
+        threads_per_run: int
+            Cores used by one simulator run.
+        cpus: list
+            Cpus to place the workers on. Defaults to the cpus this
+            process may run on.
+        pin: bool
+            Pin each worker to its cpu set.
+        env: dict
+            Extra environment variables of the workers, e.g. the
+            simulator thread option.
+
+        """
+        self.threads_per_run = threads_per_run
+        self.cpus = sorted(cpus) if cpus else available_cpus()
+        self.pin = pin
+        self.env = env or {}
+
+    def pool_size(self):
+        """ Number of workers without oversubscription."""
+        return max(len(self.cpus) // self.threads_per_run, 1)
+
+    def cpu_set(self, slot):
+        """ Cpus of the worker in the slot."""
+        nb_sets = self.pool_size()
+        start = (slot % nb_sets) * self.threads_per_run
+        return self.cpus[start:start + self.threads_per_run] or self.cpus
+
+    def apply(self, slot):
+        """ Place the current process: called inside each worker."""
+        threads = str(self.threads_per_run)
+        for name in THREAD_VARIABLES:
+            os.environ[name] = threads
+        os.environ.update({key: str(value)
+                           for key, value in self.env.items()})
+        if self.pin and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, self.cpu_set(slot))
@@ -1,32 +1,138 @@
 """ Plot simulation production. """
-import pandas as pd
+import os
+import re
+import math
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import matplotlib
-from matplotlib.legend import _get_legend_handles_labels
+from util.lazy import LazyModule, pyplot as plt
+from util.models import ModelCollection
+from util.ensemble import EnsembleStats
+from util.decimate import METHODS, decimate, single_trace
+
+# Imported on first use
+pd = LazyModule('pandas')
+sns = LazyModule('seaborn')
+matplotlib = LazyModule('matplotlib')
 
 
 class PlotPymex:
 
     """Docstring for PlotPymex. """
 
-    def __init__(self, dataframe):
+    def __init__(self, dataframe, decimation='minmax',
+                 points_per_pixel=2, output=None):
         """Create fancy plot productions for the dataframe
 
         Parameters
         ----------
-        dataframe: pandas.DataFrame instance
+        dataframe: pandas.DataFrame or ModelCollection instance
             Include cumulative production, injection,
-            wells rates and pressure.
+            wells rates and pressure. A long-form DataFrame holds
+            a 'Models' column; a ModelCollection keeps one frame
+            per model and only the plotted columns are gathered.
+        decimation: str
+            'minmax' or 'lttb' downsampling of the series before
+            plotting, None to plot every time step. Min/max buckets
+            keep every peak and are the fastest.
+        points_per_pixel: float
+            Points kept per pixel of the axes width.
+        output: str
+            File every plot is saved to, instead of its default file
+            or the interactive window. Formatted with the page number
+            by the per-well plots.
 
         """
         self.dframe = dataframe
+        self.decimation = decimation
+        self.points_per_pixel = points_per_pixel
+        self.output = output
+
+    def _data(self, *columns):
+        """ Long-form data with the time, the columns and the
+        models."""
+        if isinstance(self.dframe, ModelCollection):
+            return self.dframe.frame(('time',) + columns)
+        return self.dframe
+
+    def _window(self, column, window=None):
+        """ Long-form rows of the column inside the time window."""
+        data = self._data(column)
+        if window is None:
+            return data
+        time = data['time']
+        return data[(time >= window[0]) & (time <= window[1])]
+
+    def _lineplot(self, column, ax=None, window=None, **kwargs):
+        """ Plot the column against time, one line per model.
+
+        The series are sliced to the time window and decimated to the
+        width of the axes. Models with a single trace are drawn
+        without the seaborn estimator and confidence interval.
+        """
+        ax = ax or plt.gca()
+        data = self._window(column, window)
+        if single_trace(data, 'time', 'Models'):
+            kwargs.setdefault('estimator', None)
+            nb_points = int(self.points_per_pixel
+                            * ax.get_window_extent().width)
+            data = decimate(data, 'time', column, nb_points, 'Models',
+                            self.decimation)
+        return sns.lineplot(x='time', y=column, data=data, style='Models',
+                            hue='Models', ax=ax, **kwargs)
+
+    def zoom(self, column, window, ax=None,
+             position=(0.75, 0.3, 0.2, 0.2), title='Zoom', margin=0.05):
+        """ Inset of the column inside a time window.
+
+        Only the rows of the window are plotted, and the y limits
+        follow the sliced data.
+
+        Parameters
+        ----------
+        column: str
+            Column plotted against time.
+        window: tuple
+            (start, end) time of the zoom.
+        ax: matplotlib.axes.Axes
+            Axes holding the inset. Current axes when missing.
+        position: tuple
+            (left, bottom, width, height) of the inset in figure
+            coordinates.
+        title: str
+            Title of the inset.
+        margin: float
+            Fraction of the y range added above and below the data.
+
+        """
+        ax = ax or plt.gca()
+        inset = ax.figure.add_axes(position)
+        values = self._window(column, window)[column]
+        self._lineplot(column, ax=inset, window=window)
+        inset.set(xlim=window, title=title, xlabel='', ylabel='')
+        if values.notna().any():
+            low, high = values.min(), values.max()
+            pad = margin * (high - low) or margin * abs(high) or 1.
+            inset.set_ylim(low - pad, high + pad)
+        if inset.get_legend() is not None:
+            inset.get_legend().remove()
+        return inset
+
+    def save(self, path=None):
+        """ Save the current figure to the output file or to path;
+        show it when neither is set."""
+        path = self.output or path
+        if path is None:
+            plt.show()
+        else:
+            plt.savefig(path)
 
     @staticmethod
     def set_style_2():
         """ Set style 2"""
-        plt.style.use(['seaborn-white', 'seaborn-paper'])
+        # The seaborn styles are named seaborn-v0_8-* since
+        # matplotlib 3.6
+        plt.style.use([name if name in plt.style.available
+                       else name.replace('seaborn', 'seaborn-v0_8')
+                       for name in ('seaborn-white', 'seaborn-paper')])
         matplotlib.rc("font", family="Times New Roman")
 
     @staticmethod
@@ -42,23 +148,94 @@ class PlotPymex:
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('spe10_fine_perm.eps', format='eps')
+        self.save('spe10_fine_perm.eps')
+
+    def npv_boxplot(self, stats=None, names=None, path='npv.npy',
+                    chunk_size=256):
+        """ Plot npv boxplot of each model from streamed statistics.
 
-    def npv_boxplot(self):
-        """ Plot npv boxplot."""
+        The box spans P25 to P75 and the whiskers P10 to P90, the
+        realizations beyond them are not drawn.
+
+        Parameters
+        ----------
+        stats: EnsembleStats instance
+            Statistics of the npv, one cell per model. Streamed from
+            path when missing.
+        names: list
+            Name of each model; W3, W2, W1 and HF for four models.
+        path: str
+            (realizations, models) array of the negated npv.
+        chunk_size: int
+            Realizations read at a time from path.
+
+        """
+        if stats is None:
+            stats = EnsembleStats.from_npy(path, chunk_size, scale=-1.)
+        nb_models = len(stats.mean)
+        if names is None:
+            names = ['W3', 'W2', 'W1', 'HF'] if nb_models == 4 else \
+                [f"M{index + 1}" for index in range(nb_models)]
+        quantiles = {prob: stats.quantile(prob)
+                     for prob in (0.1, 0.25, 0.5, 0.75, 0.9)}
+        boxes = [{'label': name, 'med': quantiles[0.5][index],
+                  'q1': quantiles[0.25][index],
+                  'q3': quantiles[0.75][index],
+                  'whislo': quantiles[0.1][index],
+                  'whishi': quantiles[0.9][index],
+                  'mean': stats.mean[index]}
+                 for index, name in enumerate(names)]
+        colors = sns.color_palette(n_colors=nb_models)
         fig, ax = plt.subplots()
-        npv = -1 * np.load('npv.npy')
-        w3 = pd.DataFrame({'npv': npv[:, 0], 'Models': 'W3'})
-        w2 = pd.DataFrame({'npv': npv[:, 1], 'Models': 'W2'})
-        w1 = pd.DataFrame({'npv': npv[:, 2], 'Models': 'W1'})
-        hf = pd.DataFrame({'npv': npv[:, 3], 'Models': 'HF'})
-        df = pd.concat([w3, w2, w1, hf]).reset_index(drop=True)
-        ax = sns.boxplot(x="Models", y="npv", data=df, showfliers=False)
-        ax.set(xlabel='Models', ylabel=r'NPV ($1 \times 10^{-6}}$)')
+        artists = ax.bxp(boxes, showfliers=False, patch_artist=True,
+                         medianprops={'color': 'black'})
+        for box, color in zip(artists['boxes'], colors):
+            box.set_facecolor(color)
+        ax.set(xlabel='Models', ylabel=r'NPV ($1 \times 10^{-6}$)')
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('npv_boxplt_spe10.eps', format='eps')
+        self.save('npv_boxplt_spe10.eps')
+
+    def fan_chart(self, summaries, ylabel,
+                  bands=((0.1, 0.9), (0.25, 0.75)), ax=None):
+        """ Median and percentile bands over time of model ensembles.
+
+        Parameters
+        ----------
+        summaries: dict
+            Model name -> EnsembleStats instance of a column, indexed
+            by the time steps.
+        ylabel: str
+            Label of the y axis.
+        bands: tuple
+            (lower, upper) probabilities of the shaded bands, the
+            outer first.
+        ax: matplotlib.axes.Axes
+            Axes to draw on; a new figure is saved when missing.
+
+        """
+        figure = ax is None
+        if figure:
+            fig, ax = plt.subplots()
+        styles = self._styles(list(summaries))
+        for name, stats in summaries.items():
+            time = np.arange(len(stats.mean)) if stats.index is None \
+                else np.asarray(stats.index)
+            color = styles[name]['color']
+            for order, (lower, upper) in enumerate(bands):
+                ax.fill_between(time, stats.quantile(lower),
+                                stats.quantile(upper), color=color,
+                                alpha=0.15 * (order + 1), linewidth=0)
+            ax.plot(time, stats.quantile(0.5), label=name, **styles[name])
+        ax.set(xlabel='Time (days)', ylabel=ylabel)
+        ax.legend()
+        if figure:
+            self.set_style_2()
+            fig.set_size_inches(6, 3)
+            plt.tight_layout()
+            self.save()
+        return ax
 
    # def plot_cum_oil_prod(self):
    #      """ Plot cumulative oil production."""
@@ -79,250 +256,227 @@ class PlotPymex:
         """ Plot cumulative oil production with
         zoom in [7000, 7300] x."""
         fig, ax = plt.subplots()
-        axes = sns.lineplot(x='time',
-                            y='cum_op',
-                            data=self.dframe,
-                            style='Models',
-                            hue='Models',
-                            ax=ax)
+        axes = self._lineplot('cum_op', ax=ax)
         axes.set(xlabel='Time (days)',
                  ylabel='Cumulative Oil Production ($m^3$)')
-        ax2 = plt.axes([0.2, 0.4, .2, .2],
-                       position=[0.75, 0.3, 0.2, 0.2],
-                       ylim=[470000, 520000])
-        axes2 = sns.lineplot(x='time',
-                             y='cum_op',
-                             data=self.dframe,
-                             style='Models',
-                             hue='Models',
-                             ax=ax2)
-        # ADDED: Remove labels.
-        axes2.set_ylabel('')
-        axes2.set_xlabel('')
-        plt.legend([], [], frameon=False)
-        axes2.set_title('Zoom')
-        axes2.set_xlim([3000, 3600])
+        self.zoom('cum_op', (3000, 3600), ax=ax)
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('egg_cum_oil_models.eps', format='eps')
+        self.save('egg_cum_oil_models.eps')
 
     def plot_cum_oil_prod_zoom_spe(self):
         """ Plot cumulative oil production with
         zoom in [7000, 7300] x."""
         fig, ax = plt.subplots()
-        axes = sns.lineplot(x='time',
-                            y='cum_op',
-                            data=self.dframe,
-                            style='Models',
-                            hue='Models',
-                            ax=ax)
+        axes = self._lineplot('cum_op', ax=ax)
         axes.set(xlabel='Time (days)',
                  ylabel='Cumulative Oil Production ($m^3$)')
-        ax2 = plt.axes([0.2, 0.4, .2, .2],
-                       position=[0.6, 0.3, 0.2, 0.2],
-                       ylim=[4000, 50000])
-        axes2 = sns.lineplot(x='time',
-                             y='cum_op',
-                             data=self.dframe,
-                             style='Models',
-                             hue='Models',
-                             ax=ax2)
-        # ADDED: Remove labels.
-        axes2.set_ylabel('')
-        axes2.set_xlabel('')
-        plt.legend([], [], frameon=False)
-        axes2.set_title('Zoom')
-        axes2.set_xlim([7000, 7300])
+        self.zoom('cum_op', (7000, 7300), ax=ax,
+                  position=(0.6, 0.3, 0.2, 0.2))
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('spe10_cum_oil_models.eps', format='eps')
+        self.save('spe10_cum_oil_models.eps')
 
     def plot_oil_rate(self):
         """ Plot Oil rate production."""
         fig, ax = plt.subplots()
-        axes = sns.lineplot(x='time',
-                            y='prod1_or',
-                            data=self.dframe,
-                            style='Models',
-                            hue='Models')
+        axes = self._lineplot('prod1_or')
         axes.set(xlabel='Time (days)',
                  ylabel='Oil rate (bbl / day)')
         self.set_size(plt.gcf())
-        plt.show()
+        self.save()
 
     def plot_cum_gas_prod(self):
         """ Plot cumulative gas production."""
         fig, ax = plt.subplots()
-        axes = sns.lineplot(x='time',
-                            y='cum_gp',
-                            data=self.dframe,
-                            style='Models',
-                            hue='Models')
+        axes = self._lineplot('cum_gp')
         axes.set(xlabel='Time (days)',
                  ylabel='Cumulative Gas Production ($ft^3$)')
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('spe10_cum_gas_models.eps', format='eps')
+        self.save('spe10_cum_gas_models.eps')
 
     def plot_cum_gas_prod_zoom(self):
         """ Plot cumulative gas production."""
         fig, ax = plt.subplots()
-        axes = sns.lineplot(x='time',
-                            y='cum_gp',
-                            data=self.dframe,
-                            style='Models',
-                            hue='Models',
-                            ax=ax)
+        axes = self._lineplot('cum_gp', ax=ax)
         axes.set(xlabel='Time (days)',
                  ylabel='Cumulative Gas Production ($ft^3$)')
         fig.tight_layout()
-        ax2 = plt.axes([0.2, 0.4, .2, .2],
-                       position=[0.75, 0.3, 0.2, 0.2],
-                       ylim=[1.45e6, 1.55e6])
-        axes2 = sns.lineplot(x='time',
-                             y='cum_gp',
-                             data=self.dframe,
-                             style='Models',
-                             hue='Models',
-                             ax=ax2)
-        # ADDED: Remove labels.
-        axes2.set_ylabel('')
-        axes2.set_xlabel('')
-        plt.legend([], [], frameon=False)
-        axes2.set_title('Zoom')
-        axes2.set_xlim([7000, 7300])
+        self.zoom('cum_gp', (7000, 7300), ax=ax)
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('spe10_cum_gas_models_2.eps', format='eps')
+        self.save('spe10_cum_gas_models_2.eps')
 
     def plot_ave_pressure(self):
         """ Plot average reservoi pressure."""
-        axes = sns.lineplot(x='time',
-                            y='pres',
-                            data=self.dframe,
-                            style='Models',
-                            hue='Models')
+        axes = self._lineplot('pres')
         axes.set(xlabel='Time (days)',
                  ylabel='Average reservoir pressure (psia)')
         self.set_size(plt.gcf())
-        plt.show()
+        self.save()
 
     def plot_cum_wat_prod_zoom(self):
         """ Plot cumulative gas production."""
         fig, ax = plt.subplots()
-        axes = sns.lineplot(x='time',
-                            y='cum_wp',
-                            data=self.dframe,
-                            style='Models',
-                            hue='Models',
-                            ax=ax)
+        axes = self._lineplot('cum_wp', ax=ax)
         axes.set(xlabel='Time (days)',
                  ylabel='Cumulative Water Production ($m^3$)')
-        ax2 = plt.axes([0.2, 0.4, .2, .2],
-                       position=[0.75, 0.3, 0.2, 0.2],
-                       ylim=[1.12e6, 1.24e6])
-        axes2 = sns.lineplot(x='time',
-                             y='cum_wp',
-                             data=self.dframe,
-                             style='Models',
-                             hue='Models',
-                             ax=ax2)
-        ax2.set_title('Zoom')
-        ax2.set_xlim([3400, 3600])
-        # ADDED: Remove labels.
-        axes2.set_ylabel('')
-        axes2.set_xlabel('')
-        plt.legend([], [], frameon=False)
+        self.zoom('cum_wp', (3400, 3600), ax=ax)
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('egg_cum_water_layers.eps', format='eps')
+        self.save('egg_cum_water_layers.eps')
+
+    def well_columns(self, prefix, res_param=None, kind='prod'):
+        """ Columns of the wells, named prefix followed by the well
+        number.
+
+        Parameters
+        ----------
+        prefix: str
+            Column name before the well number, e.g. 'cum_op_p'.
+        res_param: dict
+            Reservoir configuration. The number of wells is read from
+            its 'nb_prod' or 'nb_inj' entry when given, otherwise the
+            columns are found in the data.
+        kind: str
+            'prod' or 'inj'.
+
+        """
+        if res_param is not None:
+            return [f"{prefix}{well}"
+                    for well in range(1, res_param[f'nb_{kind}'] + 1)]
+        if isinstance(self.dframe, ModelCollection):
+            columns = self.dframe.columns
+        else:
+            columns = list(self.dframe)
+        pattern = re.compile(re.escape(prefix) + r'(\d+)$')
+        wells = [(int(match.group(1)), column) for column in columns
+                 for match in [pattern.match(str(column))] if match]
+        return [column for _, column in sorted(wells)]
+
+    def plot_wells(self, prefix, ylabel, res_param=None, kind='prod',
+                   per_page=16, path=None):
+        """ Small multiples of a well quantity, one axes per well and
+        one line per model.
+
+        The data of all the wells are gathered and split by model
+        once. Each page holds at most per_page wells in a near square
+        grid with a legend shared by the page.
 
-    def cum_op_all_wells(self):
+        Parameters
+        ----------
+        prefix: str
+            Column name before the well number, e.g. 'cum_op_p'.
+        ylabel: str
+            Label of the y axes.
+        res_param: dict
+            Reservoir configuration giving the number of wells.
+        kind: str
+            'prod' or 'inj' wells.
+        per_page: int
+            Maximum number of wells of a figure.
+        path: str
+            File of each page, formatted with the page number, e.g.
+            'wells_{}.eps'. Without a placeholder, the page number is
+            added before the extension when there are several pages.
+            The pages are not saved when missing.
+
+        Returns
+        -------
+        list
+            Figure of each page.
+
+        """
+        columns = self.well_columns(prefix, res_param, kind)
+        data = self._data(*columns)
+        models = data.groupby('Models', sort=False, observed=True).indices
+        time = data['time'].to_numpy()
+        styles = self._styles(list(models))
+        if path is not None and len(columns) > per_page and \
+                path.format(1) == path.format(2):
+            root, extension = os.path.splitext(path)
+            path = root.replace('{', '{{').replace('}', '}}') + '_{}' + \
+                extension
+        figures = []
+        for first in range(0, len(columns), per_page):
+            page = columns[first:first + per_page]
+            ncols = math.ceil(math.sqrt(len(page)))
+            nrows = math.ceil(len(page) / ncols)
+            fig, axes = plt.subplots(nrows, ncols, sharex=True,
+                                     sharey=True, squeeze=False,
+                                     figsize=(3 * ncols, 2.2 * nrows + 0.6))
+            for ax, column in zip(axes.flat, page):
+                values = data[column].to_numpy()
+                nb_points = int(self.points_per_pixel
+                                * ax.get_window_extent().width)
+                for name, rows in models.items():
+                    x_data, y_data = self._trace(time[rows], values[rows],
+                                                 nb_points)
+                    ax.plot(x_data, y_data, label=name, **styles[name])
+                well = column[len(prefix):]
+                ax.set_title(f"{kind.upper()}{well}")
+            for ax in axes.flat[len(page):]:
+                ax.set_visible(False)
+            for col in range(ncols):
+                # Bottom visible axes of each column
+                row = nrows - 1 if col < len(page) - (nrows - 1) * ncols \
+                    else nrows - 2
+                axes[row, col].xaxis.set_tick_params(labelbottom=True)
+                axes[row, col].set_xlabel('Time (days)')
+            for ax in axes[:, 0]:
+                ax.set_ylabel(ylabel)
+            handles, labels = axes.flat[0].get_legend_handles_labels()
+            fig.tight_layout(rect=(0, 0.6 / fig.get_figheight(), 1, 1))
+            fig.legend(handles, labels, loc='lower center',
+                       ncol=min(len(labels), 7), fontsize='small')
+            if path is not None:
+                fig.savefig(path.format(first // per_page + 1))
+            figures.append(fig)
+        return figures
+
+    @staticmethod
+    def _styles(names):
+        """ Color and dashes of each model, as seaborn hue and style
+        draw them."""
+        colors = sns.color_palette(n_colors=len(names))
+        dashes = ['', (4, 1.5), (1, 1), (3, 1.25, 1.5, 1.25),
+                  (5, 1, 1, 1)]
+        styles = {}
+        for index, name in enumerate(names):
+            dash = dashes[index % len(dashes)]
+            styles[name] = {'color': colors[index],
+                            'linestyle': (0, dash) if dash else '-'}
+        return styles
+
+    def _trace(self, time, values, nb_points):
+        """ Decimated trace of one model, averaged over time when the
+        model holds several traces."""
+        if len(time) > 1 and not np.all(np.diff(time) > 0):
+            time, inverse = np.unique(time, return_inverse=True)
+            values = np.bincount(inverse, values) / np.bincount(inverse)
+        if self.decimation is not None:
+            rows = METHODS[self.decimation](time, values, nb_points)
+            time, values = time[rows], values[rows]
+        return time, values
+
+    def cum_op_all_wells(self, res_param=None):
         """ Plot the cumulative wells production
         for each well."""
-        fig, axes = plt.subplots(2, 2, sharex=True, sharey=True)
-
-        # Prod 1
-        ax1 = sns.lineplot(ax=axes[0, 0], x='time', y='cum_op_p1',
-                           data=self.dframe, style='Models',
-                           hue='Models')
-        axes[0, 0].set_title('PROD1')
-        ax1.get_legend().remove()
-
-        # Prod 2
-        ax2 = sns.lineplot(ax=axes[0, 1], x='time', y='cum_op_p2', data=self.dframe, style='Models',
-                           hue='Models')
-        axes[0, 1].set_title('PROD2')
-        ax2.get_legend().remove()
-
-        # Prod 3
-        ax3 = sns.lineplot(ax=axes[1, 0], x='time', y='cum_op_p3',
-                           data=self.dframe, style='Models',
-                           hue='Models')
-        axes[1, 0].set_title('PROD3')
-        ax3.get_legend().remove()
-
-        # Prod 4
-        ax4 = sns.lineplot(ax=axes[1, 1], x='time', y='cum_op_p4',
-                           data=self.dframe, style='Models',
-                           hue='Models')
-        axes[1, 1].set_title('PROD4')
-        ax4.get_legend().remove()
-
-        for iax in axes.flat:
-            iax.set(xlabel='Time (days)',
-                    ylabel='Cumulative Oil Production ($m^3$)')
-        plt.tight_layout()
-        fig.subplots_adjust(bottom=0.18)
-        fig.legend(labels=['HF', 'U1', 'U2', 'U3',
-                           'W1', 'W2', 'W3'], loc="lower center",
-                   ncol=4, fontsize='small')
-        plt.show()
+        self.plot_wells('cum_op_p', 'Cumulative Oil Production ($m^3$)',
+                        res_param, path=self.output)
+        if self.output is None:
+            plt.show()
 
-    def oil_rate_all_wells(self):
+    def oil_rate_all_wells(self, res_param=None):
         """ Plot the oil rate wells production
         for each well."""
-        fig, axes = plt.subplots(2, 2, sharex=True, sharey=True)
-
-        # Prod 1
-        ax1 = sns.lineplot(ax=axes[0, 0], x='time', y='cum_or_p1',
-                           data=self.dframe, style='Models',
-                           hue='Models')
-        axes[0, 0].set_title('PROD1')
-        ax1.get_legend().remove()
-
-        # Prod 2
-        ax2 = sns.lineplot(ax=axes[0, 1], x='time', y='cum_or_p2',
-                           data=self.dframe, style='Models',
-                           hue='Models')
-        axes[0, 1].set_title('PROD2')
-        ax2.get_legend().remove()
-
-        # Prod 3
-        ax3 = sns.lineplot(ax=axes[1, 0], x='time', y='cum_or_p3',
-                           data=self.dframe, style='Models',
-                           hue='Models')
-        axes[1, 0].set_title('PROD3')
-        ax3.get_legend().remove()
-
-        # Prod 4
-        ax4 = sns.lineplot(ax=axes[1, 1], x='time', y='cum_or_p4',
-                           data=self.dframe, style='Models',
-                           hue='Models')
-        axes[1, 1].set_title('PROD4')
-        ax4.get_legend().remove()
-
-        for iax in axes.flat:
-            iax.set(xlabel='Time (days)',
-                    ylabel='Oil Rate ($m^3 / day$)')
-        plt.tight_layout()
-        fig.subplots_adjust(bottom=0.18)
-        fig.legend(labels=['HF', 'U1', 'U2', 'U3',
-                           'W1', 'W2', 'W3'], loc="lower center",
-                   ncol=4, fontsize='small')
-        plt.show()
+        self.plot_wells('cum_or_p', 'Oil Rate ($m^3 / day$)', res_param,
+                        path=self.output)
+        if self.output is None:
+            plt.show()
@@ -1,28 +1,61 @@
 """ Plot optimization results."""
 import numpy as np
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import matplotlib
-from util.simulate import Simulation
+from util.lazy import LazyModule, pyplot as plt
+from util.optlog import VECTOR_COLUMNS, parse_vectors, read_log
+from util.controls import unique_controls
+from util.telemetry import Telemetry
+
+# Imported on first use
+pd = LazyModule('pandas')
+sns = LazyModule('seaborn')
+matplotlib = LazyModule('matplotlib')
 
 
 class PlotOpt:
 
     """Plot Optimization Results."""
 
-    def __init__(self, mult_df, hf_df=None, restore_npv=True):
+    def __init__(self, mult_df, hf_df=None, restore_npv=True,
+                 scheduler=None, vectors=None, dedup_tol=0., output=None,
+                 telemetry=None):
         """
 
         Parameters
         ----------
         opt_frame: pandas dataframe
+        scheduler: LicenseScheduler
+            License scheduler used by the high fidelity evaluation.
+            Defaults to a budget of four licenses.
+        vectors: dict
+            Parsed 'x_c' and 'x_s' columns, as returned by read_log.
+            Parsed from mult_df when missing.
+        dedup_tol: float
+            Control vectors of the high fidelity evaluation closer
+            than this tolerance are simulated once.
+        output: str
+            File every plot is saved to, instead of its default file
+            or the interactive window.
+        telemetry: pandas.DataFrame or str
+            Simulation telemetry records, or the JSON-lines file they
+            were logged to. The HF evaluation fills it when missing.
 
 
         """
         self.data = mult_df
+        if vectors is None:
+            vectors = {name: parse_vectors(mult_df[name])
+                       for name in VECTOR_COLUMNS if name in mult_df}
+        self.x_center = vectors.get('x_c')
+        self.x_star = vectors.get('x_s')
         self.high = hf_df
         self.restore_npv = restore_npv
+        self.scheduler = scheduler
+        self.dedup_tol = dedup_tol
+        self.output = output
+        if isinstance(telemetry, str):
+            telemetry = Telemetry.read(telemetry)
+        self.telemetry = telemetry
+        self.saved_simulations = 0
         self.x_level = []
         self.time = []
         self.nfe = []
@@ -30,10 +63,33 @@ class PlotOpt:
         if not restore_npv:
             self.npv_level = self.evaluate_x_level()
 
+    @classmethod
+    def from_csv(cls, opt_path, hf_path=None, **kwargs):
+        """ Create from the tab separated optimization logs, reusing
+        the parsed binary sidecar of each log."""
+        mult_df, vectors = read_log(opt_path)
+        hf_df = None
+        if hf_path is not None:
+            hf_df, _ = read_log(hf_path)
+        return cls(mult_df, hf_df, vectors=vectors, **kwargs)
+
+    def save(self, path=None):
+        """ Save the current figure to the output file or to path;
+        show it when neither is set."""
+        path = self.output or path
+        if path is None:
+            plt.show()
+        else:
+            plt.savefig(path)
+
     @staticmethod
     def set_style_2():
         """ Set style 2"""
-        plt.style.use(['seaborn-white', 'seaborn-paper'])
+        # The seaborn styles are named seaborn-v0_8-* since
+        # matplotlib 3.6
+        plt.style.use([name if name in plt.style.available
+                       else name.replace('seaborn', 'seaborn-v0_8')
+                       for name in ('seaborn-white', 'seaborn-paper')])
         matplotlib.rc("font", family="Times New Roman")
 
     def set_style(self):
@@ -60,35 +116,22 @@ class PlotOpt:
     def groupby_level(self):
         """ Select the first design variable position
         in each level of the optimization."""
-        arr = np.empty((0, 6), int)
-        breakpoint()
-        first = self.data.groupby('opt_level').first()['x_c']
-        self.time = self.data.groupby('opt_level').last()['time-spend']
-        self.nfe = self.data.groupby('opt_level').last()['nfev-hf']
-        for row in first:
-            np_first = self.stringtoarray(row)
-            arr = np.vstack((arr, np_first))
-        last = self.data['x_s'].iloc[-1][1:-1]
-        last = np.fromstring(last, sep=' ')
-        self.x_level = np.vstack((arr, last))
+        levels = self.data.groupby('opt_level')
+        first = levels.cumcount().to_numpy() == 0
+        order = np.argsort(self.data['opt_level'].to_numpy()[first],
+                           kind='stable')
+        self.time = levels.last()['time-spend']
+        self.nfe = levels.last()['nfev-hf']
+        self.x_level = np.vstack((self.x_center[first][order],
+                                  self.x_star[-1]))
 
     def group_xcenter(self):
         """ Get all x center values."""
-        arr = np.empty((0, 6), int)
-        xct = self.data['x_c']
-        for row in xct:
-            row = self.stringtoarray(row)
-            arr = np.vstack((arr, row))
-        return arr
+        return self.x_center
 
     def group_xstar(self):
-        """ Get all x center values."""
-        arr = np.empty((0, 6), int)
-        xct = self.data['x_c']
-        for row in xct:
-            row = self.stringtoarray(row)
-            arr = np.vstack((arr, row))
-        return arr
+        """ Get all x star values."""
+        return self.x_star
 
     def evaluate_x_level(self):
         """ Evaluate the high fidelity values of the
@@ -96,17 +139,36 @@ class PlotOpt:
         if self.restore_npv:
             npv = -1 * np.load('npv_level_spe10_wav.npy')
         else:
+            # Trust region iterations repeat x_c until a step is
+            # accepted: simulate each unique control once
+            controls, inverse = unique_controls(self.group_xcenter(),
+                                                self.dedup_tol)
+            self.saved_simulations = len(inverse) - len(controls)
+            print(f"HF evaluation of {len(controls)} unique controls, "
+                  f"{self.saved_simulations} simulations saved")
+            # The simulator stack is only loaded for the HF evaluation
+            from util.simulate import Simulation
+            from util.scheduler import LicenseScheduler
             # Create simulation instance
-            controls = self.group_xcenter()
-            breakpoint()
             reservoir_config = './PyMEX/reservoir_config_ml.yaml'
-            reservoir = Simulation(reservoir_config)
-            # High Fidelity template
-            reservoir.res_param['run_folder'] = False
-            reservoir.template = reservoir.res_param['original']
-            npv = reservoir.npv(controls, pool_size=4)
+            scheduler = self.scheduler or LicenseScheduler(4)
+            with Simulation(reservoir_config, scheduler=scheduler,
+                            telemetry_log='npv_wav_telemetry.jsonl') \
+                    as reservoir:
+                # High Fidelity template
+                reservoir.res_param['run_folder'] = False
+                reservoir.template = reservoir.res_param['original']
+                # Journal the runs so an interrupted evaluation resumes
+                npv = np.empty(len(controls))
+                results = reservoir.map_unordered(controls,
+                                                  journal='npv_wav.jsonl')
+                for done, (index, value) in enumerate(results, 1):
+                    npv[index] = value
+                    print(f"HF evaluation {done}/{len(controls)}")
+                if self.telemetry is None:
+                    self.telemetry = reservoir.telemetry.frame()
+            npv = npv[inverse]
             np.save('npv_wav.npy', npv)
-            breakpoint()
         return npv
 
     def plot_multilevel_sea_spe10(self):
@@ -129,7 +191,7 @@ class PlotOpt:
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('ml_opt_spe10.eps', format='eps')
+        self.save('ml_opt_spe10.eps')
 
     def plot_multilevel_sea_egg(self):
         """ Plot multilevel seaborn scheme."""
@@ -151,7 +213,7 @@ class PlotOpt:
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('ml_opt_egg.eps', format='eps')
+        self.save('ml_opt_egg.eps')
 
     def plot_multilevel_npv(self):
         """ Plot multilevel optimization iterations."""
@@ -165,11 +227,19 @@ class PlotOpt:
         plt.xlabel('Iterations')
         plt.legend(title="Models")
         plt.tight_layout()
-        plt.show()
+        self.save()
 
     def plot_time_npv(self):
         """ Plot time comparation between hf optimization and
-        multilevel optimization."""
+        multilevel optimization.
+
+        With simulation telemetry, a second axes breaks the wall time
+        of the simulations of each template down into queue wait,
+        simulator run and post-processing.
+        """
+        if self.telemetry is not None:
+            fig, (ax, ax_cost) = plt.subplots(2, 1)
+            plt.sca(ax)
         npv_level = self.npv_level
         fob_c = -1 * self.data.fob_c.values
         fob_hf = -1 * self.high.fob_c.values
@@ -183,18 +253,34 @@ class PlotOpt:
         plt.ylabel(r"NPV ($1 \times 10^{-6}$)")
         plt.xlabel('CPU time (seconds)')
         plt.legend(title="Models")
+        if self.telemetry is not None:
+            self.plot_cost_breakdown(ax_cost)
         plt.tight_layout()
-        plt.show()
+        self.save()
+
+    def plot_cost_breakdown(self, ax=None):
+        """ Stacked wall time of the simulations of each template,
+        from the telemetry records."""
+        ax = ax or plt.gca()
+        simulated = self.telemetry[self.telemetry['run'].notna()]
+        costs = simulated.groupby('template')[
+            ['queue_wait', 'run', 'post']].sum()
+        costs.columns = ['Queue wait', 'Simulator run', 'Post-processing']
+        costs.plot.barh(stacked=True, ax=ax)
+        ax.set_xlabel('Wall time (seconds)')
+        ax.set_ylabel('')
+        ax.legend(fontsize='small')
+        return ax
 
     def plot_controls(self):
         """ Plot control for each cycle. """
         fig, ax = plt.subplots()
         times = [0, 2433, 4687, 7300]
         rate_max = 500
-        clf = self.stringtoarray(self.data['x_s'].iloc[-1])
+        clf = self.x_star[-1]
         prod_lf = clf[::2] * rate_max
         inj_lf = clf[1::2] * rate_max
-        chf = self.stringtoarray(self.data['x_c'].iloc[-1])
+        chf = self.x_center[-1]
         prod_hf = chf[::2] * rate_max
         inj_hf = chf[1::2] * rate_max
 
@@ -211,10 +297,11 @@ class PlotOpt:
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('spe10_controls.eps', format='eps')
+        self.save('spe10_controls.eps')
 
     def plt_heatmap_controls(self):
         """ Plot heatmap controls."""
+        from util.simulate import Simulation
         fig, ax = plt.subplots()
         reservoir_config = './PyMEX/reservoir_config_ml.yaml'
         reservoir = Simulation(reservoir_config)
@@ -236,12 +323,11 @@ class PlotOpt:
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('control_heatmap.eps', format='eps')
+        self.save('control_heatmap.eps')
 
     def opt_history(self):
         """ Plot optimization history of low fidelity and
         high fidelity. """
-        breakpoint()
         fig, ax = plt.subplots()
         wav_data = np.load('npv_egg_orig_wav.npy')
         plt.plot(-1 * wav_data, marker='o')
@@ -252,14 +338,13 @@ class PlotOpt:
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('opt_hist_egg.eps', format='eps')
+        self.save('opt_hist_egg.eps')
 
     def opt_history_ori(self):
         """ Plot optimization history of low fidelity and
         high fidelity. """
         fig, ax = plt.subplots()
         wav_data = np.load('npv_level_spe10_wav2.npy')
-        breakpoint()
         high_data = -1 * self.high['fob_c'].values
         plt.plot(-1 * wav_data, marker='o')
         plt.plot(high_data, marker='+')
@@ -269,4 +354,4 @@ class PlotOpt:
         self.set_style_2()
         fig.set_size_inches(6, 3)
         plt.tight_layout()
-        plt.savefig('tr_upd_spe10.eps', format='eps')
+        self.save('tr_upd_spe10.eps')
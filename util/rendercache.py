@@ -0,0 +1,145 @@
+""" Cache of the rendered figure files. """
+import os
+import json
+import hashlib
+import importlib.util
+import importlib.metadata
+
+# Modules loading and drawing the figures of each kind of dataset
+PLOT_MODULES = {'models': ('util.plot', 'util.decimate', 'util.models',
+                           'util.ensemble', 'util.dtypes', 'util.store'),
+                'optlog': ('util.plot_opt', 'util.optlog',
+                           'util.controls')}
+
+# Files the plotting methods read by themselves, from the working folder
+DATA_FILES = {'models': ('npv.npy', 'spe10_fperm.npy'),
+              'optlog': ('npv_level_spe10_wav.npy',
+                         'npv_level_spe10_wav2.npy',
+                         'npv_egg_orig_wav.npy')}
+
+
+def _file_stamp(path):
+    """ Identity of a file without reading it."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _argument_files(values):
+    """ Stamps of the arguments naming existing files."""
+    return {name: _file_stamp(value) for name, value in values.items()
+            if isinstance(value, str) and os.path.isfile(value)}
+
+
+def _version(package):
+    """ Installed version of a package, None when missing."""
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _module_digest(name):
+    """ Digest of the source of a module."""
+    with open(importlib.util.find_spec(name).origin, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class RenderCache:
+
+    """ Fingerprints of the figures already rendered.
+
+    A figure job is fingerprinted from the files of its dataset, the
+    data files the methods read, the files named by its arguments, the
+    source of the loading and plotting modules, the method, its
+    arguments and options, and the matplotlib and seaborn versions.
+    A job whose fingerprint is unchanged and whose output file still
+    exists is not drawn again.
+    """
+
+    def __init__(self, path='.render_cache.json'):
+        """
+
+        Parameters
+        ----------
+        path: str
+            Json file of the fingerprints.
+
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._modules = {}
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                self.entries = json.load(file)
+
+    def _sources(self, kind):
+        """ Digests of the modules drawing a kind of dataset."""
+        if kind not in self._modules:
+            self._modules[kind] = [_module_digest(name)
+                                   for name in PLOT_MODULES[kind]]
+        return self._modules[kind]
+
+    def fingerprint(self, job, spec):
+        """ Fingerprint of a figure job and of its dataset entry."""
+        kind = spec.get('kind', 'models')
+        if kind == 'optlog':
+            files = [spec['opt'], spec.get('hf')]
+        else:
+            files = list(spec['models'].values())
+        args = job.get('args', {})
+        options = job.get('options', {})
+        content = {'files': [_file_stamp(path) for path in files
+                             if path is not None],
+                   'data_files': [_file_stamp(path)
+                                  for path in DATA_FILES[kind]],
+                   'argument_files': [_argument_files(args),
+                                      _argument_files(options)],
+                   'dataset': spec,
+                   'sources': self._sources(kind),
+                   'method': job['method'],
+                   'args': args,
+                   'options': options,
+                   'matplotlib': _version('matplotlib'),
+                   'seaborn': _version('seaborn')}
+        encoded = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    @staticmethod
+    def _exists(output):
+        """ True when the output file, or its first page, exists. The
+        pages of an output without a placeholder are numbered before
+        the extension."""
+        if '{}' in output:
+            output = output.format(1)
+        root, extension = os.path.splitext(output)
+        return os.path.exists(output) or \
+            os.path.exists(f"{root}_1{extension}")
+
+    def lookup(self, job, fingerprint):
+        """ True when the job output is up to date."""
+        if self.entries.get(job['output']) == fingerprint and \
+                self._exists(job['output']):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def put(self, job, fingerprint):
+        """ Record a rendered job."""
+        self.entries[job['output']] = fingerprint
+
+    def save(self):
+        """ Write the fingerprints atomically."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.entries, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        """ Hits and misses of the cache."""
+        return {'hits': self.hits, 'misses': self.misses}
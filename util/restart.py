@@ -0,0 +1,117 @@
+""" Prefix tree of simulator restart files. """
+import os
+import hashlib
+import numpy as np
+
+
+class RestartTree:
+
+    """ Restart files indexed by the control cycles already simulated.
+
+    Each node of the tree is the prefix of the first k control cycles.
+    Its address chains the address of the parent with the controls of
+    cycle k, so looking up the longest stored prefix of a control only
+    walks its own cycles. The nodes live on disk, one restart file
+    each, and the least recently used ones are evicted.
+    """
+
+    def __init__(self, restart_dir='.pymex_restart', max_entries=100):
+        """
+
+        Parameters
+        ----------
+        restart_dir: str
+            Folder of the restart files.
+        max_entries: int
+            Maximum number of restart files kept on disk.
+
+        """
+        self.restart_dir = restart_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        os.makedirs(restart_dir, exist_ok=True)
+
+    @staticmethod
+    def prefixes(control, nb_cycles, digest):
+        """ Addresses of the prefixes of 1 to nb_cycles - 1 cycles."""
+        cycles = np.ascontiguousarray(control, dtype=np.float64)
+        cycles = cycles.reshape(nb_cycles, -1)
+        address = digest
+        addresses = []
+        for cycle in cycles[:-1]:
+            hasher = hashlib.sha256(address.encode())
+            hasher.update(cycle.tobytes())
+            address = hasher.hexdigest()
+            addresses.append(address)
+        return addresses
+
+    def path(self, address):
+        """ Restart file of the node."""
+        return os.path.join(self.restart_dir, address + '.rst')
+
+    def __contains__(self, address):
+        return os.path.exists(self.path(address))
+
+    def _touch(self, address):
+        """ Mark a stored node as recently used; False when it is not
+        stored."""
+        try:
+            os.utime(self.path(address))
+        except OSError:
+            return False
+        self.hits += 1
+        return True
+
+    def evict(self):
+        """ Remove the least recently used restart files."""
+        entries = [os.path.join(self.restart_dir, name)
+                   for name in os.listdir(self.restart_dir)
+                   if name.endswith('.rst')]
+        excess = len(entries) - self.max_entries
+        if excess > 0:
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def plan(self, controls, nb_cycles, digest):
+        """ Restart plan of a batch of controls.
+
+        Every control restarts from the longest prefix that is either
+        already stored or shared with another control of the batch.
+        The stored prefixes used are marked as recently used.
+
+        Returns
+        -------
+        plan: list
+            (nb_cycles, address) for each control, (0, None) when the
+            control runs from the start.
+        missing: dict
+            Address -> (control, nb_cycles) of the prefixes that must
+            be simulated and checkpointed first.
+
+        """
+        addresses = [self.prefixes(control, nb_cycles, digest)
+                     for control in controls]
+        shared = {}
+        for prefixes in addresses:
+            for address in prefixes:
+                shared[address] = shared.get(address, 0) + 1
+        plan = []
+        missing = {}
+        for control, prefixes in zip(controls, addresses):
+            step = (0, None)
+            stored = False
+            for length in range(len(prefixes), 0, -1):
+                address = prefixes[length - 1]
+                stored = self._touch(address)
+                if stored or shared[address] > 1:
+                    step = (length, address)
+                    break
+            length, address = step
+            if address is not None and not stored:
+                missing.setdefault(address, (control, length))
+            plan.append(step)
+        return plan, missing
@@ -0,0 +1,33 @@
+""" Retry policy of the simulation batches. """
+
+
+class RetryPolicy:
+
+    """ Time limit, retries and speculative runs of a batch.
+
+    Parameters
+    ----------
+    timeout: float
+        Wall-clock limit of each simulation in seconds. None means no
+        limit.
+    retries: int
+        Number of new attempts of a failed or timed out simulation.
+    speculative: float
+        Fraction of the batch in (0, 1]. Once this fraction of the
+        simulations is finished, a duplicate of each simulation still
+        running is launched and the first result is kept. The other
+        run is then killed and its license returned; on the workers of
+        a Coordinator it cannot be killed and runs to its end. None
+        disables speculative runs.
+
+    """
+
+    def __init__(self, timeout=None, retries=0, speculative=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.speculative = speculative
+
+    def __repr__(self):
+        return (f"RetryPolicy(timeout={self.timeout}, "
+                f"retries={self.retries}, "
+                f"speculative={self.speculative})")
@@ -0,0 +1,126 @@
+""" License aware scheduler of simulation runs. """
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from util.evaluator import TaskCancelled
+
+
+# Priority classes, lower values run first
+PRIORITY_HF = 0
+PRIORITY_LF = 10
+
+
+class LicenseScheduler:
+
+    """ Limit the concurrent simulator runs to the license budget.
+
+    The same scheduler can be shared by several Simulation instances,
+    so that all of them draw from a single pool of license tokens.
+    Queued runs are started by priority class and, inside a class,
+    in submission order.
+    """
+
+    def __init__(self, licenses):
+        """
+
+        Parameters
+        ----------
+        licenses: int
+            Number of simulator license tokens available.
+
+        """
+        self.licenses = licenses
+        self.running = 0
+        self.waits = []
+        self._heap = []
+        self._started = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def submit(self, evaluator, args, priority=PRIORITY_LF, timeout=None):
+        """ Queue evaluator.submit(*args, timeout=timeout) and return a
+        Future. The time limit starts when the run leaves the queue."""
+        future = Future()
+        with self._lock:
+            heapq.heappush(self._heap, (priority, next(self._order),
+                                        time.perf_counter(), evaluator,
+                                        args, timeout, future))
+        self._drain()
+        return future
+
+    def _drain(self):
+        """ Start queued runs while licenses are free."""
+        started = []
+        with self._lock:
+            while self._heap and self.running < self.licenses:
+                priority, _, queued, evaluator, args, timeout, future = \
+                    heapq.heappop(self._heap)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.running += 1
+                self.waits.append((priority, time.perf_counter() - queued))
+                started.append((evaluator, args, timeout, future))
+        for evaluator, args, timeout, future in started:
+            try:
+                inner = evaluator.submit(*args, timeout=timeout)
+            except Exception as exc:
+                self._release(future, None, exc)
+                continue
+            self._started[future] = (evaluator, inner)
+            inner.add_done_callback(self._on_done(future))
+
+    def _on_done(self, future):
+        """ Callback forwarding the evaluator result to the Future."""
+
+        def _done(inner):
+            if inner.cancelled():
+                # Cancelled in the evaluator queue, after leaving ours
+                self._release(future, None, TaskCancelled('run cancelled'))
+                return
+            error = inner.exception()
+            result = inner.result() if error is None else None
+            self._release(future, result, error)
+
+        return _done
+
+    def _release(self, future, result, error):
+        """ Return the license and resolve the Future."""
+        with self._lock:
+            self.running -= 1
+            self._started.pop(future, None)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+        self._drain()
+
+    def cancel(self, future):
+        """ Cancel a run: a queued run leaves the queue, a running one is
+        cancelled on its evaluator and its license is returned when the
+        evaluator stops it. Return False when the run already
+        finished."""
+        if future.cancel():
+            return True
+        with self._lock:
+            started = self._started.get(future)
+        if started is None:
+            return False
+        evaluator, inner = started
+        return evaluator.cancel(inner)
+
+    @property
+    def queued(self):
+        """ Number of runs waiting for a license."""
+        return len(self._heap)
+
+    def wait_stats(self):
+        """ Queue wait time statistics, in seconds, by priority."""
+        stats = {}
+        for priority, wait in self.waits:
+            stats.setdefault(priority, []).append(wait)
+        return {priority: {'runs': len(waits),
+                           'mean': sum(waits) / len(waits),
+                           'max': max(waits)}
+                for priority, waits in sorted(stats.items())}
@@ -1,25 +1,162 @@
 """ Simulate reservoi class. """
+import time
 import yaml
 import numpy as np
-from PyMEX.utilits.ManiParam import PyMEX
-import multiprocessing as mp
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from util.backend import PyMEXBackend
+from util.cache import NpvCache, config_digest, control_key
+from util.evaluator import Evaluator, TaskTimeout, TaskCancelled
+from util.journal import Journal
+from util.gradient import stencil
+from util.restart import RestartTree
+from util.retry import RetryPolicy
+from util.scheduler import LicenseScheduler, PRIORITY_HF, PRIORITY_LF
+from util.telemetry import Telemetry, PeakMemory, stamp
+
+
+def _run_npv(config, control):
+    """ Worker task: net present value of one control."""
+    backend, template, restore_file, res_param = config
+    model = backend.run(control, template, restore_file, res_param)
+    return model.npv
+
+
+def _run_checkpoint(config, control, nb_cycles, path):
+    """ Worker task: simulate the first cycles and save a restart."""
+    backend, template, restore_file, res_param = config
+    return backend.checkpoint(control, template, restore_file, res_param,
+                              nb_cycles, path)
+
+
+def _run_restart(config, control, nb_cycles, path):
+    """ Worker task: net present value restarting after nb_cycles."""
+    backend, template, restore_file, res_param = config
+    model = backend.restart(control, template, restore_file, res_param,
+                            nb_cycles, path)
+    return model.npv
+
+
+TASKS = {'npv': _run_npv,
+         'checkpoint': _run_checkpoint,
+         'restart': _run_restart}
+
+
+def _run_task(config, kind, *args):
+    """ Dispatch a worker task by kind. Return its result and the
+    stamp of its run."""
+    record = stamp()
+    with PeakMemory() as memory:
+        value = TASKS[kind](config, *args)
+    record['finished'] = time.time()
+    record['peak_rss'] = memory.peak
+    return value, record
+
+
+def _status(error, attempt=0):
+    """ Telemetry status of a finished task."""
+    if isinstance(error, TaskTimeout):
+        return 'timeout'
+    if isinstance(error, TaskCancelled):
+        return 'cancelled'
+    if error is not None:
+        return 'failed'
+    return 'retried' if attempt else 'ok'
 
 
 class Simulation:
 
     """ Reservoir parameters for simulation."""
 
-    def __init__(self, reservoir_config, restore_file=False):
-        """ Reservoir parameters."""
+    def __init__(self, reservoir_config, restore_file=False,
+                 use_cache=True, cache_dir='.pymex_cache',
+                 cache_size=10000, pool_size=None, scheduler=None,
+                 priority=None, backend=None,
+                 restart_dir='.pymex_restart', restart_size=100,
+                 cluster=None, retry=None, placement=None,
+                 telemetry_log=None):
+        """ Reservoir parameters.
+
+        Parameters
+        ----------
+        reservoir_config: str or dict
+            Path of the yaml reservoir configuration, or the
+            parameters themselves.
+        restore_file: bool
+            Restore the results of a previous run.
+        use_cache: bool
+            Reuse the results of controls already simulated.
+        cache_dir: str
+            Folder of the on-disk result cache.
+        cache_size: int
+            Maximum number of cached results.
+        pool_size: int
+            Default number of worker processes of the evaluator.
+        scheduler: LicenseScheduler
+            Scheduler shared with other simulations. When missing and
+            the configuration defines 'licenses', a private scheduler
+            with that budget is created.
+        priority: int
+            Priority class of the runs. By default the original (high
+            fidelity) template runs before the coarse models.
+        backend: Backend
+            Simulator backend. Defaults to PyMEX.
+        restart_dir: str
+            Folder of the cycle prefix restart files, used when the
+            backend supports restarts. None disables the reuse.
+        restart_size: int
+            Maximum number of restart files.
+        cluster: Coordinator
+            Run the simulations on the workers registered with this
+            coordinator instead of local processes.
+        retry: RetryPolicy
+            Time limit, retries and speculative runs of the batches.
+            By default failures are not retried.
+        placement: Placement
+            Cpu placement of the local workers. Sizes the pool from
+            the cores and the threads per run when pool_size is not
+            given.
+        telemetry_log: str
+            JSON-lines file the telemetry records are appended to.
+            They are kept in the telemetry attribute either way.
+
+        """
         self.reservoir_config = reservoir_config
+        self.backend = backend or PyMEXBackend()
         self.restore_file = restore_file
         self.res_param = self.reservoir_parameters()
         self.nominal = self.x_nominal()
         self.num_simulations = 0
         self.template = self.res_param['template'][0]
+        self.cache = None
+        if use_cache:
+            self.cache = NpvCache(cache_dir, cache_size)
+        self.restarts = None
+        if restart_dir and self.backend.supports_restart:
+            self.restarts = RestartTree(restart_dir, restart_size)
+        self.pool_size = pool_size
+        self.cluster = cluster
+        self.retry = retry or RetryPolicy()
+        self.placement = placement
+        self.throughput = []
+        self.telemetry = Telemetry(telemetry_log)
+        self.failures = {}
+        if scheduler is None and self.res_param.get('licenses'):
+            scheduler = LicenseScheduler(self.res_param['licenses'])
+        self.scheduler = scheduler
+        self._priority = priority
+        self._evaluator = None
+        self._evaluator_digest = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def reservoir_parameters(self):
         """ Return the reservoir configuration."""
+        if isinstance(self.reservoir_config, dict):
+            return dict(self.reservoir_config)
         with open(self.reservoir_config) as file:
             res_param = yaml.load(file, Loader=yaml.FullLoader)
         return res_param
@@ -61,33 +198,419 @@ class Simulation:
         return np.tile(rate_cycle, self.res_param["nb_cycles"])
 
     def run_parallel(self, control):
-        """ Run PyMEX with Pool."""
-        model = PyMEX(control,
-                      self.template,
-                      self.restore_file,
-                      self.res_param)
-        return model.npv
-
-    def npv(self, controls, pool_size):
-        """ Net present value of controls. """
-        with mp.Pool(pool_size) as proc:
-            npv = proc.map(self.run_parallel, controls)
-        return np.array(npv)
+        """ Run the simulator for one control."""
+        key = self.cache_key(control)
+        submitted = time.time()
+        self.num_simulations += 1
+        try:
+            npv, record = _run_task(self._config(), 'npv', control)
+        except Exception as exc:
+            self.telemetry.task('npv', self.template, key, 'failed',
+                                submitted, None, error=repr(exc))
+            raise
+        self.telemetry.task('npv', self.template, key, 'ok', submitted,
+                            record)
+        return npv
+
+    def _config(self):
+        """ Configuration shipped to the workers."""
+        return self.backend, self.template, self.restore_file, self.res_param
+
+    def cache_key(self, control, kind='npv'):
+        """ Cache key of the control under the current configuration."""
+        digest = config_digest(*self._config())
+        return control_key(control, digest, kind)
+
+    def evaluator(self, pool_size=None):
+        """ Long-lived evaluator for the current configuration.
+
+        The workers receive the configuration once. A new evaluator
+        is started when the template or the reservoir parameters
+        change, or when a different pool size is requested. With a
+        cluster, the configuration is bound to its coordinator.
+        """
+        pool_size = pool_size or self.pool_size
+        if not pool_size:
+            limits = []
+            if self.placement is not None:
+                limits.append(self.placement.pool_size())
+            if self.scheduler is not None:
+                limits.append(self.scheduler.licenses)
+            pool_size = min(limits, default=None)
+        digest = config_digest(*self._config())
+        current = self._evaluator
+        resize = (pool_size and self.cluster is None
+                  and pool_size != getattr(current, 'pool_size', None))
+        if current is not None and (
+                digest != self._evaluator_digest or resize):
+            current.close()
+            current = None
+        if current is None:
+            if self.cluster is not None:
+                current = self.cluster.bind(_run_task, self._config())
+            else:
+                initializer = None
+                if self.placement is not None:
+                    initializer = self.placement.apply
+                current = Evaluator(_run_task, self._config(), pool_size,
+                                    initializer)
+            self._evaluator = current
+            self._evaluator_digest = digest
+        return current
+
+    @property
+    def priority(self):
+        """ Priority class of the runs of the current template."""
+        if self._priority is not None:
+            return self._priority
+        if self.template == self.res_param.get('original'):
+            return PRIORITY_HF
+        return PRIORITY_LF
+
+    def _launch(self, task, pool_size=None):
+        """ Start one worker task, through the scheduler if any."""
+        evaluator = self.evaluator(pool_size)
+        timeout = self.retry.timeout
+        if self.scheduler is None:
+            return evaluator.submit(*task, timeout=timeout)
+        return self.scheduler.submit(evaluator, task, self.priority,
+                                     timeout)
+
+    def _cancel(self, future):
+        """ Cancel a task started by _launch; a running task is killed
+        and its license returned."""
+        if self.scheduler is not None:
+            return self.scheduler.cancel(future)
+        return self._evaluator.cancel(future)
+
+    def submit(self, control):
+        """ Schedule the net present value of one control and
+        return a Future."""
+        key = self.cache_key(control)
+        template = self.template
+        future = Future()
+        if self.cache is not None:
+            npv = self.cache.get(key)
+            if npv is not None:
+                self.telemetry.record(kind='npv', template=template,
+                                      key=key, status='cached', wall=0.)
+                future.set_result(npv)
+                return future
+        submitted = time.time()
+        task = self._launch(('npv', control))
+
+        def _done(done):
+            if done.cancelled():
+                future.cancel()
+                return
+            self.num_simulations += 1
+            error = done.exception()
+            if error is not None:
+                self.telemetry.task('npv', template, key, _status(error),
+                                    submitted, None, error=repr(error))
+                future.set_exception(error)
+                return
+            npv, record = done.result()
+            if self.cache is not None:
+                self.cache.put(key, npv)
+            self.telemetry.task('npv', template, key, 'ok', submitted,
+                                record)
+            future.set_result(npv)
+
+        future.add_done_callback(
+            lambda done: done.cancelled() and task.cancel())
+        task.add_done_callback(_done)
+        return future
+
+    def map_unordered(self, controls, pool_size=None, journal=None):
+        """ Yield (index, npv) pairs as the simulations finish.
+
+        Cached controls are yielded first and repeated controls
+        are simulated once. The npv of the controls that failed after
+        all the retries is NaN, and their errors are stored in
+        the failures dict by index.
+
+        Parameters
+        ----------
+        controls: array_like
+            Control vectors, one per row.
+        pool_size: int
+            Number of worker processes.
+        journal: str
+            Journal file. Each result is appended as it completes and
+            the controls already in the journal are not simulated
+            again, so an interrupted batch resumes where it stopped.
+
+        """
+        if journal is not None:
+            with Journal(journal) as log:
+                yield from self._map_unordered(controls, pool_size, log)
+        else:
+            yield from self._map_unordered(controls, pool_size, None)
+
+    def _map_unordered(self, controls, pool_size, journal):
+        """ Batch evaluation of map_unordered."""
+        self.failures = {}
+        keys = [self.cache_key(control) for control in controls]
+        misses = {}
+        for index, (control, key) in enumerate(zip(controls, keys)):
+            npv = None
+            status = None
+            if journal is not None and key in journal:
+                npv = journal.entries[key]
+                status = 'journal'
+            elif key not in misses and self.cache is not None:
+                npv = self.cache.get(key)
+                status = 'cached'
+            if npv is not None:
+                self.telemetry.record(kind='npv', template=self.template,
+                                      key=key, status=status, wall=0.)
+                yield index, npv
+            else:
+                misses.setdefault(key, (control, []))[1].append(index)
+        if not misses:
+            return
+        start = time.perf_counter()
+        for key, npv in self._simulate_misses(misses, pool_size):
+            if isinstance(npv, Exception):
+                for index in misses[key][1]:
+                    self.failures[index] = npv
+                npv = np.nan
+            else:
+                if self.cache is not None:
+                    self.cache.put(key, npv)
+                if journal is not None:
+                    journal.append(key, npv)
+            for index in misses[key][1]:
+                yield index, npv
+        self._record_throughput(len(misses), time.perf_counter() - start)
+
+    def _record_throughput(self, runs, seconds):
+        """ Record the simulations per hour of a batch."""
+        self.throughput.append({
+            'template': self.template,
+            'pool_size': getattr(self._evaluator, 'pool_size', None),
+            'runs': runs,
+            'seconds': seconds,
+            'runs_per_hour': 3600. * runs / seconds if seconds else 0.})
+
+    def best_pool_size(self):
+        """ Pool size of the best recorded throughput of the current
+        template, or None without records."""
+        records = [record for record in self.throughput
+                   if record['template'] == self.template
+                   and record['pool_size']]
+        if not records:
+            return None
+        best = max(records, key=lambda record: record['runs_per_hour'])
+        return best['pool_size']
+
+    def _simulate_misses(self, misses, pool_size):
+        """ Yield (key, npv) of the missing controls as they finish.
+
+        When the backend supports restarts, the cycle prefixes shared
+        by several controls are simulated once and checkpointed, and
+        the controls only simulate their remaining cycles.
+
+        Failed simulations are retried following the retry policy and
+        yielded with their last error once the retries are exhausted.
+        """
+        keys = list(misses)
+        controls = [misses[key][0] for key in keys]
+        plan = [(0, None)] * len(keys)
+        missing = {}
+        if self.restarts is not None:
+            plan, missing = self.restarts.plan(
+                controls, self.res_param['nb_cycles'],
+                config_digest(*self._config()))
+        policy = self.retry
+        tasks = {}
+        attempts = {}
+        waiting = {}
+        pending = {}
+        submitted = {}
+        resolved = set()
+        speculated = not policy.speculative
+
+        def _start(key, task):
+            tasks[key] = task
+            future = self._launch(task, pool_size)
+            pending[future] = key
+            submitted[future] = time.time()
+
+        def _record(future, key):
+            """ Telemetry of a finished task; its result or None."""
+            self.num_simulations += 1
+            kind = tasks[key][0]
+            attempt = attempts.get(key, 0)
+            error = future.exception()
+            if error is not None:
+                self.telemetry.task(kind, self.template, key,
+                                    _status(error), submitted.pop(future),
+                                    None, attempt, repr(error))
+                return None
+            value, record = future.result()
+            self.telemetry.task(kind, self.template, key,
+                                _status(None, attempt),
+                                submitted.pop(future), record, attempt)
+            return value
+
+        for key, control, (length, address) in zip(keys, controls, plan):
+            attempts[key] = 0
+            if address in missing:
+                waiting.setdefault(address, []).append((key, control))
+            elif address is not None:
+                _start(key, ('restart', control, length,
+                             self.restarts.path(address)))
+            else:
+                _start(key, ('npv', control))
+        for address, (control, length) in missing.items():
+            _start(address, ('checkpoint', control, length,
+                             self.restarts.path(address)))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                if key in resolved:
+                    # Speculative copy stopped after the first result
+                    if future.cancelled():
+                        submitted.pop(future)
+                    else:
+                        _record(future, key)
+                    continue
+                value = _record(future, key)
+                if key in waiting:
+                    # Checkpoint finished: start the tails from it, or
+                    # from the start when the checkpoint failed
+                    restart = future.exception() is None
+                    length = missing[key][1]
+                    for tail_key, control in waiting.pop(key):
+                        if restart:
+                            _start(tail_key, ('restart', control, length,
+                                              self.restarts.path(key)))
+                        else:
+                            _start(tail_key, ('npv', control))
+                    continue
+                error = future.exception()
+                if error is not None:
+                    if key in pending.values():
+                        # A speculative copy is still running
+                        continue
+                    if tasks[key][0] == 'restart':
+                        # The restart file may have been evicted by
+                        # another simulation: run from the start
+                        _start(key, ('npv', tasks[key][1]))
+                        continue
+                    if attempts[key] < policy.retries:
+                        attempts[key] += 1
+                        _start(key, tasks[key])
+                        continue
+                    resolved.add(key)
+                    yield key, error
+                    continue
+                resolved.add(key)
+                # First result wins: kill the running copies, which
+                # hold a worker and a license, and wait for them
+                for copy, copy_key in pending.items():
+                    if copy_key == key:
+                        self._cancel(copy)
+                yield key, value
+            if not speculated and \
+                    len(resolved) >= policy.speculative * len(keys):
+                speculated = True
+                for key in set(pending.values()) - set(waiting):
+                    _start(key, tasks[key])
+        if self.restarts is not None:
+            self.restarts.evict()
+
+    def npv(self, controls, pool_size=None, journal=None):
+        """ Net present value of controls. Only the controls
+        missing from the cache and the journal are sent to the
+        pool. Failed simulations are NaN, see map_unordered."""
+        npv = np.empty(len(controls))
+        results = self.map_unordered(controls, pool_size, journal)
+        for index, value in results:
+            npv[index] = value
+        return npv
+
+    def gradient(self, control, method='forward', step=1e-2,
+                 nb_samples=1, seed=None, pool_size=None):
+        """ Gradient of the net present value.
+
+        All the perturbation points are evaluated as one parallel
+        batch.
+
+        Parameters
+        ----------
+        control: array_like
+            Normalized control vector, as x_nominal.
+        method: str
+            'forward', 'central' or 'spsa' differences.
+        step: float
+            Perturbation size in normalized units.
+        nb_samples: int
+            Number of random directions of the 'spsa' method.
+        seed: int
+            Seed of the 'spsa' directions.
+        pool_size: int
+            Number of worker processes.
+
+        Returns
+        -------
+        grad: numpy.ndarray
+            Gradient estimate.
+        points: numpy.ndarray
+            Unique perturbation points.
+        npv: numpy.ndarray
+            Net present value of each point.
+
+        """
+        points, weights = stencil(control, method, step, nb_samples, seed)
+        npv = self.npv(points, pool_size)
+        return weights @ npv, points, npv
+
+    def close(self):
+        """ Stop the evaluator workers."""
+        if self._evaluator is not None:
+            self._evaluator.close()
+            self._evaluator = None
 
     def restore_prod(self):
         """ Restore results."""
-        model = PyMEX(None,
-                      self.template,
-                      self.restore_file,
-                      self.res_param)
+        model = self.backend.run(None,
+                                 self.template,
+                                 self.restore_file,
+                                 self.res_param)
         return model
 
     def __call__(self, controls):
         """High fidelity model."""
+        key = self.cache_key(controls, kind='model')
+        if self.cache is not None:
+            model = self.cache.get(key)
+            if model is not None:
+                self.telemetry.record(kind='model', template=self.template,
+                                      key=key, status='cached', wall=0.)
+                return model
         if not isinstance(controls, np.ndarray):
             controls = np.array(controls)
-        model = PyMEX(controls,
-                      self.template,
-                      self.restore_file,
-                      self.res_param)
+        submitted = time.time()
+        record = stamp()
+        self.num_simulations += 1
+        try:
+            with PeakMemory() as memory:
+                model = self.backend.run(controls,
+                                         self.template,
+                                         self.restore_file,
+                                         self.res_param)
+        except Exception as exc:
+            self.telemetry.task('model', self.template, key, 'failed',
+                                submitted, None, error=repr(exc))
+            raise
+        record['finished'] = time.time()
+        record['peak_rss'] = memory.peak
+        if self.cache is not None:
+            self.cache.put(key, model)
+        self.telemetry.task('model', self.template, key, 'ok', submitted,
+                            record)
         return model
@@ -0,0 +1,230 @@
+""" Columnar on-disk store of simulation results. """
+import os
+import json
+from urllib.parse import quote
+import numpy as np
+from util.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+
+class ResultsStore:
+
+    """ Production frames stored one .npy file per column.
+
+    Runs are keyed by case, model and run and listed in a small json
+    catalog at the root. Readers load only the requested columns,
+    memory mapped, and only the rows of the requested time window.
+    Label columns are stored as integer codes and their categories,
+    dates as datetime64 in UTC with their time zone. An index other
+    than the default RangeIndex is stored the same way, one file per
+    level in an index folder.
+    """
+
+    def __init__(self, root='./results/store', time_column='time'):
+        """
+
+        Parameters
+        ----------
+        root: str
+            Folder of the store.
+        time_column: str
+            Column used to select time windows.
+
+        """
+        self.root = root
+        self.time_column = time_column
+        self._catalog_path = os.path.join(root, 'catalog.json')
+        os.makedirs(root, exist_ok=True)
+        self.catalog = self._load_catalog()
+
+    @staticmethod
+    def key(case, model, run='0'):
+        """ Catalog key of a run."""
+        return f"{case}/{model}/{run}"
+
+    def _load_catalog(self):
+        """ Read the catalog."""
+        if not os.path.exists(self._catalog_path):
+            return {}
+        with open(self._catalog_path) as file:
+            return json.load(file)
+
+    def _save_catalog(self):
+        """ Write the catalog atomically."""
+        tmp_path = f"{self._catalog_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.catalog, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self._catalog_path)
+
+    def _folder(self, case, model, run):
+        """ Folder of a run."""
+        return os.path.join(self.root, *(quote(str(part), safe='')
+                                         for part in (case, model, run)))
+
+    def _column_path(self, folder, column):
+        """ File of a column."""
+        return os.path.join(folder, quote(str(column), safe='') + '.npy')
+
+    @staticmethod
+    def _index_path(folder, level):
+        """ File of an index level."""
+        return os.path.join(folder, 'index', f"{level}.npy")
+
+    def __contains__(self, key):
+        return key in self.catalog
+
+    def entries(self, case=None, model=None):
+        """ Keys of the stored runs, optionally filtered."""
+        return [key for key in sorted(self.catalog)
+                if (case is None or key.split('/')[0] == str(case))
+                and (model is None or key.split('/')[1] == str(model))]
+
+    @staticmethod
+    def _encode(values):
+        """ Array stored for a column or an index level, and how to
+        decode it: the categories of labels and their dtype, the time
+        zone of dates."""
+        values = pd.Series(values)
+        spec = {}
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            spec['timezone'] = str(values.dt.tz)
+            values = values.dt.tz_convert(None)
+        elif not (pd.api.types.is_numeric_dtype(values)
+                  or values.dtype.kind in 'mM'):
+            if pd.api.types.is_object_dtype(values) or \
+                    pd.api.types.is_string_dtype(values):
+                spec['dtype'] = str(values.dtype)
+            values = values.astype('category')
+            spec['categories'] = values.cat.categories.astype(str).tolist()
+            values = values.cat.codes
+        return values.to_numpy(), spec
+
+    @staticmethod
+    def _decode(values, categories=None, timezone=None):
+        """ Values of a stored column or index level."""
+        if categories is not None:
+            return pd.Categorical.from_codes(values, categories)
+        if timezone is not None:
+            return pd.DatetimeIndex(values).tz_localize('UTC') \
+                .tz_convert(timezone)
+        return values
+
+    def write(self, frame, case, model, run='0'):
+        """ Store a production frame."""
+        folder = self._folder(case, model, run)
+        os.makedirs(folder, exist_ok=True)
+        categories = {}
+        timezones = {}
+        dtypes = {}
+        for column in frame:
+            values, spec = self._encode(frame[column])
+            if 'categories' in spec:
+                categories[str(column)] = spec['categories']
+            if 'timezone' in spec:
+                timezones[str(column)] = spec['timezone']
+            if 'dtype' in spec:
+                dtypes[str(column)] = spec['dtype']
+            np.save(self._column_path(folder, column), values)
+        index = []
+        if not (isinstance(frame.index, pd.RangeIndex)
+                and frame.index.start == 0 and frame.index.step == 1
+                and frame.index.name is None):
+            os.makedirs(os.path.join(folder, 'index'), exist_ok=True)
+            for level, name in enumerate(frame.index.names):
+                values, spec = self._encode(
+                    frame.index.get_level_values(level))
+                np.save(self._index_path(folder, level), values)
+                index.append(dict(spec, name=name))
+        time_sorted = self.time_column in frame and \
+            bool(frame[self.time_column].is_monotonic_increasing)
+        self.catalog[self.key(case, model, run)] = {
+            'columns': [str(column) for column in frame],
+            'rows': len(frame),
+            'categories': categories,
+            'timezones': timezones,
+            'dtypes': dtypes,
+            'index': index,
+            'time_sorted': time_sorted}
+        self._save_catalog()
+
+    def read(self, case, model, run='0', columns=None, window=None,
+             mmap=True):
+        """ Load a stored run.
+
+        Parameters
+        ----------
+        columns: list
+            Columns to load. All of them when missing.
+        window: tuple
+            (start, end) of the time window, inclusive.
+        mmap: bool
+            Memory map the column files.
+
+        """
+        entry = self.catalog[self.key(case, model, run)]
+        folder = self._folder(case, model, run)
+        mmap_mode = 'r' if mmap else None
+        columns = entry['columns'] if columns is None else list(columns)
+        rows = slice(None)
+        if window is not None:
+            times = np.load(self._column_path(folder, self.time_column),
+                            mmap_mode=mmap_mode)
+            if times.dtype.kind in 'mM':
+                window = np.asarray(window, dtype=times.dtype)
+            if entry['time_sorted']:
+                rows = slice(np.searchsorted(times, window[0], 'left'),
+                             np.searchsorted(times, window[1], 'right'))
+            else:
+                rows = np.flatnonzero((times >= window[0])
+                                      & (times <= window[1]))
+        data = {}
+        for column in columns:
+            values = np.load(self._column_path(folder, column),
+                             mmap_mode=mmap_mode)[rows]
+            data[column] = self._decode(
+                values, entry['categories'].get(column),
+                entry.get('timezones', {}).get(column))
+        index = None
+        levels = [self._decode(np.load(self._index_path(folder, level),
+                                       mmap_mode=mmap_mode)[rows],
+                               spec.get('categories'), spec.get('timezone'))
+                  for level, spec in enumerate(entry.get('index', []))]
+        names = [spec['name'] for spec in entry.get('index', [])]
+        if len(levels) == 1:
+            index = pd.Index(levels[0], name=names[0])
+        elif levels:
+            index = pd.MultiIndex.from_arrays(levels, names=names)
+        return pd.DataFrame(data, columns=columns, index=index)
+
+    def import_pickle(self, path, case, model, run='0'):
+        """ Store a frame saved with DataFrame.to_pickle."""
+        self.write(pd.read_pickle(path), case, model, run)
+        entry = self.catalog[self.key(case, model, run)]
+        entry['source'] = path
+        entry['source_mtime'] = os.path.getmtime(path)
+        self._save_catalog()
+
+    def export_pickle(self, path, case, model, run='0'):
+        """ Save a stored run with DataFrame.to_pickle, with the dtypes
+        of its labels before they were stored as categories."""
+        entry = self.catalog[self.key(case, model, run)]
+        frame = self.read(case, model, run, mmap=False)
+        frame = frame.astype(entry.get('dtypes', {}))
+        levels = [frame.index.get_level_values(level).astype(spec['dtype'])
+                  if 'dtype' in spec
+                  else frame.index.get_level_values(level)
+                  for level, spec in enumerate(entry.get('index', []))]
+        if len(levels) == 1:
+            frame.index = levels[0]
+        elif levels:
+            frame.index = pd.MultiIndex.from_arrays(levels)
+        frame.to_pickle(path)
+
+    def from_pickle(self, path, case, model, run='0', **kwargs):
+        """ Read a run, importing the pickle first when the store
+        does not hold it yet or the pickle changed."""
+        entry = self.catalog.get(self.key(case, model, run), {})
+        if os.path.getmtime(path) != entry.get('source_mtime'):
+            self.import_pickle(path, case, model, run)
+        return self.read(case, model, run, **kwargs)
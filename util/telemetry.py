@@ -0,0 +1,234 @@
+""" Per-evaluation telemetry of the simulations. """
+import os
+import json
+import time
+import threading
+from util.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# Columns of the records, in order
+COLUMNS = ('kind', 'template', 'key', 'status', 'attempt', 'worker',
+           'submitted', 'queue_wait', 'run', 'post', 'wall', 'peak_rss',
+           'error')
+
+
+def _status_bytes(pid, field):
+    """ Memory field of /proc/<pid>/status in bytes, None when the
+    process or the field is missing."""
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith(field + ':'):
+                    return 1024 * int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def _descendants(pid):
+    """ Process ids of the children of pid, recursively."""
+    found = []
+    queue = [pid]
+    while queue:
+        parent = queue.pop()
+        try:
+            threads = os.listdir(f"/proc/{parent}/task")
+        except OSError:
+            continue
+        for thread in threads:
+            try:
+                with open(f"/proc/{parent}/task/{thread}/children") as file:
+                    children = [int(child) for child in file.read().split()]
+            except (OSError, ValueError):
+                continue
+            found.extend(children)
+            queue.extend(children)
+    return found
+
+
+class _Sampler:
+
+    """ Thread of a process sampling the memory of its child processes
+    while tasks are watched."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.pid = os.getpid()
+        self.watches = set()
+        self.lock = threading.Lock()
+        self.active = threading.Event()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def sample(self):
+        """ Record the resident memory of the children started during
+        each active watch."""
+        peaks = {child: _status_bytes(child, 'VmHWM') or 0
+                 for child in _descendants(self.pid)}
+        with self.lock:
+            for watch in self.watches:
+                resident = sum(peak for child, peak in peaks.items()
+                               if child not in watch.existing)
+                watch.children = max(watch.children, resident)
+
+    def _loop(self):
+        while True:
+            self.active.wait()
+            self.sample()
+            time.sleep(self.interval)
+
+    def add(self, watch):
+        with self.lock:
+            self.watches.add(watch)
+            self.active.set()
+
+    def remove(self, watch):
+        with self.lock:
+            self.watches.discard(watch)
+            if not self.watches:
+                self.active.clear()
+
+
+# Sampler of the current process, started on first use
+_SAMPLER = {'sampler': None}
+
+
+class PeakMemory:
+
+    """ Peak resident memory of one task, in bytes.
+
+    The peak of this process is reset when the task starts (Linux
+    clear_refs) and read when it ends, and the simulator processes it
+    starts are sampled while it runs, so the peak is the task's, not
+    the largest of the worker lifetime. Child processes already alive
+    when the task starts, such as the workers of a pool, are left out.
+    The peak is the sum of both, None where they cannot be measured.
+    """
+
+    def __init__(self, interval=0.2):
+        """
+
+        Parameters
+        ----------
+        interval: float
+            Seconds between two samples of the child processes.
+
+        """
+        self.interval = interval
+        self.peak = None
+        self.children = 0
+        self.existing = set()
+        self._sampler = None
+
+    def __enter__(self):
+        try:
+            with open('/proc/self/clear_refs', 'w') as file:
+                file.write('5')
+        except OSError:
+            return self
+        sampler = _SAMPLER['sampler']
+        # Threads do not survive a fork
+        if sampler is None or sampler.pid != os.getpid() or \
+                sampler.interval != self.interval:
+            sampler = _SAMPLER['sampler'] = _Sampler(self.interval)
+        self._sampler = sampler
+        # Processes alive before the task, e.g. the workers of a pool,
+        # are not the task's
+        self.existing = set(_descendants(os.getpid()))
+        sampler.add(self)
+        return self
+
+    def __exit__(self, *exc):
+        if self._sampler is None:
+            return
+        self._sampler.sample()
+        self._sampler.remove(self)
+        own = _status_bytes('self', 'VmHWM')
+        if own is not None:
+            self.peak = own + self.children
+
+
+def stamp():
+    """ Worker side record of a task: wall clock start and end, to
+    be filled by the caller."""
+    return {'started': time.time(), 'finished': None,
+            'worker': os.getpid(), 'peak_rss': None}
+
+
+class Telemetry:
+
+    """ Timing and resource records of the evaluations.
+
+    Every evaluation, simulated or served from the cache or the
+    journal, is one record. The wall time of a simulated evaluation is
+    split into the queue wait (submission to start in the worker), the
+    simulator run, which for PyMEX includes writing the deck and
+    parsing the results, and the post-processing (result transfer,
+    cache and journal writes). Times are in seconds, the peak resident
+    memory in bytes is the task's, see PeakMemory.
+    """
+
+    def __init__(self, path=None):
+        """
+
+        Parameters
+        ----------
+        path: str
+            JSON-lines file the records are appended to. Records are
+            only kept in memory when missing.
+
+        """
+        self.path = path
+        self.records = []
+
+    def record(self, **fields):
+        """ Add a record; missing columns are None."""
+        entry = {column: fields.get(column) for column in COLUMNS}
+        if entry['wall'] is None and None not in (
+                entry['queue_wait'], entry['run'], entry['post']):
+            entry['wall'] = entry['queue_wait'] + entry['run'] + \
+                entry['post']
+        self.records.append(entry)
+        if self.path is not None:
+            with open(self.path, 'a') as file:
+                file.write(json.dumps(entry, default=str) + '\n')
+        return entry
+
+    def task(self, kind, template, key, status, submitted, worker_stamp,
+             attempt=0, error=None):
+        """ Record a worker task from its submission time and the
+        stamp returned by the worker."""
+        now = time.time()
+        if worker_stamp is None:
+            return self.record(kind=kind, template=template, key=key,
+                               status=status, attempt=attempt,
+                               submitted=submitted, wall=now - submitted,
+                               error=error)
+        return self.record(
+            kind=kind, template=template, key=key, status=status,
+            attempt=attempt, worker=worker_stamp['worker'],
+            submitted=submitted,
+            queue_wait=max(worker_stamp['started'] - submitted, 0.),
+            run=worker_stamp['finished'] - worker_stamp['started'],
+            post=max(now - worker_stamp['finished'], 0.),
+            peak_rss=worker_stamp['peak_rss'], error=error)
+
+    def __len__(self):
+        return len(self.records)
+
+    def frame(self):
+        """ Records as a DataFrame."""
+        return pd.DataFrame(self.records, columns=list(COLUMNS))
+
+    @staticmethod
+    def read(path):
+        """ DataFrame of a JSON-lines telemetry file."""
+        return pd.read_json(path, lines=True)
+
+    def summary(self):
+        """ Count and total times of the records by kind and status."""
+        frame = self.frame()
+        return frame.groupby(['kind', 'status']).agg(
+            count=('status', 'size'), queue_wait=('queue_wait', 'sum'),
+            run=('run', 'sum'), post=('post', 'sum'),
+            peak_rss=('peak_rss', 'max'))